@@ -0,0 +1,87 @@
+import argparse
+import time
+
+import numpy as np
+
+from bench_records import random_plates
+from fuzzy_match import CONFUSABLE, FuzzyPlateMatcher
+from records import RecordsStore, encode_plates
+
+# ----------------------------
+# QUERIES
+# ----------------------------
+def misread(plate, rng):
+    # One OCR confusion where the plate has a confusable character,
+    # otherwise a random substitution
+    plate = list(plate)
+    swaps = {a: b for a, b in CONFUSABLE}
+    swaps.update({b: a for a, b in CONFUSABLE})
+    spots = [i for i, c in enumerate(plate) if c in swaps]
+    if spots:
+        i = spots[rng.integers(len(spots))]
+        plate[i] = swaps[plate[i]]
+    else:
+        i = rng.integers(len(plate))
+        plate[i] = "X" if plate[i] != "X" else "Y"
+    return "".join(plate)
+
+# ----------------------------
+# BRUTE FORCE
+# ----------------------------
+def brute_force(chars, plate):
+    # Scan every registered plate for one with at most one differing
+    # character (substitutions only, the cheap half of the problem)
+    query = np.frombuffer(plate.encode(), dtype=np.uint8)
+    diff = (chars != query).sum(axis=1)
+    return np.flatnonzero(diff <= 1)
+
+# ----------------------------
+# BENCHMARK
+# ----------------------------
+def bench(n, queries, brute_queries):
+    rng = np.random.default_rng(7)
+    plates = random_plates(n, rng)
+    keys = encode_plates(plates)
+    store = RecordsStore.from_arrays(keys, np.zeros(0, np.int64),
+                                     np.zeros(0, np.uint8))
+    matcher = FuzzyPlateMatcher(store)
+
+    truth = [p.decode() for p in plates[rng.integers(0, n, queries)]]
+    reads = [misread(p, rng) for p in truth]
+
+    timings = []
+    correct = 0
+    for plate, read in zip(truth, reads):
+        t0 = time.perf_counter()
+        match = matcher.match(read)
+        timings.append(time.perf_counter() - t0)
+        correct += bool(match and match.plate == plate)
+
+    chars = plates.view(np.uint8).reshape(n, -1)
+    t0 = time.perf_counter()
+    for read in reads[:brute_queries]:
+        brute_force(chars, read)
+    brute = (time.perf_counter() - t0) / brute_queries
+
+    timings = np.array(timings) * 1e3
+    print(f"--- {n:,} plates, {queries:,} misread queries ---")
+    print(f"fuzzy index   p50 {np.percentile(timings, 50):.3f} ms  "
+          f"p99 {np.percentile(timings, 99):.3f} ms")
+    print(f"brute force   {brute * 1e3:.1f} ms/query "
+          f"(substitutions only)")
+    print(f"recovered     {correct / queries:.1%} of misreads")
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark fuzzy plate matching against a brute-force scan")
+    parser.add_argument("--sizes", type=int, nargs="+",
+                        default=[1_000_000, 10_000_000])
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--brute-queries", type=int, default=20)
+    args = parser.parse_args()
+
+    for n in args.sizes:
+        bench(n, args.queries, args.brute_queries)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+import argparse
+import sys
+import time
+
+from fuzzy_match import FuzzyPlateMatcher, normalize_plate
+from metrics import StageTimer
+from motion_gate import MotionGate
+from ocr_backend import make_ocr_backend
+from ocr_pipeline import read_plate
+from plate_detector import PlateDetector
+from plate_voting import PlateVoter
+from preprocess import METHODS, Preprocessor
+from records import check_vehicle, is_valid_plate, load_records
+from replay import ReplaySource, load_ground_truth
+from vehicle_db import demo_records
+
+STAGES = ["capture", "roi", "detect", "gray", "resize", "threshold", "ocr",
+          "regex", "vote", "lookup"]
+
+# ----------------------------
+# REPLAY RUN
+# ----------------------------
+def run(source, backend, records, matcher, roi, truth, motion_gate=None,
+        limit=None, detector=None, preprocess=None):
+    # Runs every frame through the recognition pipeline on this thread,
+    # one stage after another, so per-stage times are not blurred by
+    # queueing between threads
+    timer = StageTimer()
+    voter = PlateVoter(validate=is_valid_plate, normalize=normalize_plate)
+
+    frames = ocr_calls = ocr_errors = ocr_hits = 0
+    labelled = correct = false_reads = 0
+    committed = []
+
+    start = time.perf_counter()
+    while limit is None or frames < limit:
+        with timer("capture"):
+            ok, frame = source.read()
+        if not ok:
+            break
+        frames += 1
+
+        # Every labelled frame counts, so frames the motion gate skipped,
+        # OCR failed on or the detector found nothing in count as wrong
+        expected = truth.get(source.name) if truth else None
+        if expected:
+            labelled += 1
+
+        if detector:
+            if motion_gate and not motion_gate.check(frame):
+                continue
+            with timer("detect"):
+                crops = [c.crop for c in detector.detect(frame)]
+        else:
+            with timer("roi"):
+                h, w = frame.shape[:2]
+                fx1, fy1, fx2, fy2 = roi
+                crops = [frame[int(h*fy1):int(h*fy2), int(w*fx1):int(w*fx2)]]
+                if motion_gate and not motion_gate.check(crops[0]):
+                    continue
+
+        # Candidates are read best first until one looks like a plate,
+        # as OCRWorkerPool does
+        text = None
+        for crop in crops:
+            ocr_calls += 1
+            try:
+                text, confidence = read_plate(crop, backend, timer,
+                                              preprocess)
+            except Exception:
+                ocr_errors += 1
+                text = None
+                continue
+            if is_valid_plate(normalize_plate(text)):
+                ocr_hits += 1
+                break
+        if text is None:
+            continue
+
+        with timer("regex"):
+            plate = normalize_plate(text)
+            valid = is_valid_plate(plate)
+
+        if expected:
+            correct += plate == expected
+        elif expected == "" and valid:
+            false_reads += 1
+
+        if not valid:
+            continue
+
+        with timer("vote"):
+            consensus = voter.add(plate, confidence)
+        with timer("lookup"):
+            check_vehicle(records, plate, matcher)
+        if consensus:
+            committed.append(consensus.plate)
+
+    elapsed = time.perf_counter() - start
+    return {
+        "timer": timer, "elapsed": elapsed, "frames": frames,
+        "ocr_calls": ocr_calls, "ocr_errors": ocr_errors,
+        "ocr_hits": ocr_hits,
+        "labelled": labelled, "correct": correct,
+        "false_reads": false_reads, "committed": committed,
+    }
+
+# ----------------------------
+# REPORT
+# ----------------------------
+def report(result, truth, detector=None, preprocess=None):
+    elapsed = result["elapsed"]
+    print(f"frames        {result['frames']} in {elapsed:.2f}s "
+          f"({result['frames'] / elapsed:.1f} frames/s)")
+    if detector:
+        detect_time = sum(result["timer"].samples["detect"]) or 1e-9
+        print(f"detections    {detector.detections} candidates in "
+              f"{detector.frames} frames ({detector.detections / elapsed:.1f}"
+              f"/s overall, detector alone {detector.frames / detect_time:.1f}"
+              f" frames/s)")
+    print(f"ocr calls     {result['ocr_calls']} "
+          f"({result['ocr_calls'] / elapsed:.1f}/s, "
+          f"{result['ocr_errors']} errors)")
+    calls = result["ocr_calls"] or 1
+    print(f"ocr hit rate  {result['ocr_hits'] / calls:.1%} of calls read a "
+          f"valid plate")
+    if preprocess:
+        mix = ", ".join(f"{method} {n}"
+                        for method, n in preprocess.used.most_common())
+        print(f"preprocessing {preprocess.method}: {mix}")
+
+    print(f"{'stage':10s} {'calls':>7s} {'p50 ms':>9s} {'p95 ms':>9s} "
+          f"{'p99 ms':>9s}")
+    timer = result["timer"]
+    for stage in STAGES:
+        samples = timer.samples.get(stage)
+        if not samples:
+            continue
+        p50, p95, p99 = timer.percentiles(stage)
+        print(f"{stage:10s} {len(samples):7d} {p50:9.3f} {p95:9.3f} "
+              f"{p99:9.3f}")
+
+    if not truth:
+        return None
+
+    accuracy = result["correct"] / result["labelled"] if result["labelled"] else 0.0
+    print(f"frame reads   {result['correct']}/{result['labelled']} correct "
+          f"({accuracy:.1%}), {result['false_reads']} plates read on "
+          f"frames without one")
+
+    expected = {p for p in truth.values() if p}
+    committed = set(result["committed"])
+    hits = len(expected & committed)
+    print(f"plates        {hits}/{len(expected)} recognised, "
+          f"{len(committed - expected)} wrong plates committed")
+    return accuracy
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Replay a video or image directory through the "
+                    "recognition pipeline and report speed and accuracy")
+    parser.add_argument("source", help="video file or image directory")
+    parser.add_argument("--truth",
+                        help="CSV of frame,plate to measure accuracy against")
+    parser.add_argument("--ocr", default="auto",
+                        choices=["auto", "tesserocr", "pytesseract"])
+    parser.add_argument("--records",
+                        help="records file, directory or .tgx index "
+                             "(default: demo lists)")
+    parser.add_argument("--roi", type=float, nargs=4,
+                        default=[0.25, 0.45, 0.75, 0.65],
+                        metavar=("X1", "Y1", "X2", "Y2"),
+                        help="plate region as fractions of the frame")
+    parser.add_argument("--realtime", action="store_true",
+                        help="pace frames at the source frame rate "
+                             "instead of max speed")
+    parser.add_argument("--detect", action="store_true",
+                        help="find plates with the PlateDetector instead of "
+                             "reading the fixed ROI")
+    parser.add_argument("--preprocess", default="auto", choices=METHODS,
+                        help="plate binarisation to benchmark")
+    parser.add_argument("--motion-gate", action="store_true",
+                        help="skip OCR on frames the motion gate rejects")
+    parser.add_argument("--no-fuzzy", action="store_true")
+    parser.add_argument("--limit", type=int, help="stop after N frames")
+    parser.add_argument("--min-fps", type=float,
+                        help="exit non-zero below this many frames/s")
+    parser.add_argument("--min-accuracy", type=float,
+                        help="exit non-zero below this frame accuracy (0-1)")
+    args = parser.parse_args()
+
+    source = ReplaySource(args.source, realtime=args.realtime)
+    if not source.isOpened():
+        sys.exit(f"cannot open {args.source}")
+    records = load_records(args.records) if args.records else demo_records()
+    matcher = None if args.no_fuzzy else FuzzyPlateMatcher(records)
+    truth = load_ground_truth(args.truth) if args.truth else None
+    backend = make_ocr_backend(args.ocr)
+
+    detector = PlateDetector() if args.detect else None
+    preprocess = Preprocessor(args.preprocess)
+    result = run(source, backend, records, matcher, args.roi, truth,
+                 MotionGate() if args.motion_gate else None, args.limit,
+                 detector, preprocess)
+    source.release()
+    backend.close()
+    accuracy = report(result, truth, detector, preprocess)
+
+    failed = False
+    fps = result["frames"] / result["elapsed"]
+    if args.min_fps is not None and fps < args.min_fps:
+        print(f"FAIL {fps:.1f} frames/s is below {args.min_fps}")
+        failed = True
+    if args.min_accuracy is not None and (accuracy or 0.0) < args.min_accuracy:
+        print(f"FAIL accuracy {accuracy or 0.0:.1%} is below "
+              f"{args.min_accuracy:.1%}")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
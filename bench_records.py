@@ -0,0 +1,145 @@
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from records import (OFFENSES, MmapRecords, RecordsStore, encode_plates,
+                     write_index)
+
+# ----------------------------
+# SYNTHETIC PLATES
+# ----------------------------
+LETTERS = np.frombuffer(b"ABCDEFGHIJKLMNOPQRSTUVWXYZ", dtype=np.uint8)
+DIGITS = np.frombuffer(b"0123456789", dtype=np.uint8)
+LAYOUT = "LLDDLLDDDD"  # same shape as is_valid_plate()
+
+def random_plates(n, rng):
+    chars = np.empty((n, len(LAYOUT)), dtype=np.uint8)
+    for i, kind in enumerate(LAYOUT):
+        pool = LETTERS if kind == "L" else DIGITS
+        chars[:, i] = pool[rng.integers(0, len(pool), n)]
+    return chars.view(f"S{len(LAYOUT)}").ravel()
+
+def synthetic_store(n, offense_ratio, rng):
+    plates = random_plates(n, rng)
+    n_off = int(n * offense_ratio)
+    offense_plates = plates[rng.integers(0, n, n_off)]
+    bits = np.array([bit for bit, _, _ in OFFENSES], dtype=np.uint8)
+    offense_bits = bits[rng.integers(0, len(bits), n_off)]
+    return plates, offense_plates, offense_bits
+
+def write_csv(path, plates, offense_plates, offense_bits):
+    names = {bit: name for bit, name, _ in OFFENSES}
+    with open(path, "w") as f:
+        f.write("plate,category\n")
+        for p in plates:
+            f.write(f"{p.decode()},valid\n")
+        for p, bit in zip(offense_plates, offense_bits):
+            f.write(f"{p.decode()},{names[int(bit)]}\n")
+
+# ----------------------------
+# BENCHMARK
+# ----------------------------
+def bench(n, offense_ratio, lookups, with_csv, bloom_fp_rate, with_index):
+    rng = np.random.default_rng(42)
+    plates, offense_plates, offense_bits = synthetic_store(n, offense_ratio, rng)
+
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    valid_keys = encode_plates(plates)
+    offense_keys = encode_plates(offense_plates)
+    t1 = time.perf_counter()
+    store = RecordsStore.from_arrays(valid_keys, offense_keys, offense_bits)
+    t2 = time.perf_counter()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del valid_keys, offense_keys
+
+    probe = [p.decode() for p in plates[rng.integers(0, n, lookups)]]
+    t3 = time.perf_counter()
+    for plate in probe:
+        store.lookup(plate)
+    t4 = time.perf_counter()
+
+    print(f"--- {n:,} plates, {len(offense_plates):,} offense rows ---")
+    print(f"encode        {t1 - t0:8.2f} s")
+    print(f"build index   {t2 - t1:8.2f} s")
+    print(f"resident      {store.nbytes / 2**20:8.1f} MiB "
+          f"({store.nbytes / n:.1f} B/plate)")
+    print(f"peak (build)  {peak / 2**20:8.1f} MiB")
+    print(f"lookup        {(t4 - t3) / lookups * 1e6:8.2f} us/plate")
+
+    if bloom_fp_rate:
+        # Clean plates only: the case the filter is meant to short-circuit
+        clean = np.flatnonzero(store.offenses.get_many(encode_plates(plates)) == 0)
+        keys = [int(k) for k in encode_plates(plates[rng.choice(clean, lookups)])]
+
+        t5 = time.perf_counter()
+        for key in keys:
+            store.offenses.get(key, 0)
+        t6 = time.perf_counter()
+        store.enable_bloom(bloom_fp_rate)
+        t7 = time.perf_counter()
+        for key in keys:
+            if key in store.bloom:
+                store.offenses.get(key, 0)
+        t8 = time.perf_counter()
+        passed = int(store.bloom.contains_many(np.array(keys)).sum())
+
+        print(f"bloom build   {t7 - t6:8.2f} s, {store.bloom.nbytes / 2**20:.1f} MiB,"
+              f" k={store.bloom.k}, measured fp {store.bloom.fp_rate:.4f}")
+        print(f"clean offense {(t6 - t5) / lookups * 1e6:8.2f} us exact, "
+              f"{(t8 - t7) / lookups * 1e6:.2f} us with bloom "
+              f"({lookups - passed} skipped, {passed} false +)")
+
+    if with_index:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "records.tgx")
+            write_index(path, store.registered_keys, store.offense_keys,
+                        store.offense_masks)
+            t9 = time.perf_counter()
+            mapped = MmapRecords(path)
+            t10 = time.perf_counter()
+            for plate in probe:
+                mapped.lookup(plate)
+            t11 = time.perf_counter()
+            print(f"mmap open     {(t10 - t9) * 1e3:8.2f} ms "
+                  f"({os.path.getsize(path) / 2**20:.0f} MiB file)")
+            print(f"mmap lookup   {(t11 - t10) / lookups * 1e6:8.2f} us/plate")
+            del mapped
+
+    if with_csv:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "records.csv")
+            write_csv(path, plates, offense_plates, offense_bits)
+            t5 = time.perf_counter()
+            RecordsStore.from_csv(path)
+            print(f"load csv      {time.perf_counter() - t5:8.2f} s "
+                  f"({os.path.getsize(path) / 2**20:.0f} MiB file)")
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark records store load time and memory")
+    parser.add_argument("--sizes", type=int, nargs="+",
+                        default=[10_000_000, 50_000_000])
+    parser.add_argument("--offense-ratio", type=float, default=0.05)
+    parser.add_argument("--lookups", type=int, default=100_000)
+    parser.add_argument("--csv", action="store_true",
+                        help="also time loading the same data from CSV")
+    parser.add_argument("--bloom-fp-rate", type=float, default=0.01,
+                        help="false-positive rate for the Bloom filter "
+                             "comparison (0 to skip)")
+    parser.add_argument("--index", action="store_true",
+                        help="also time opening and probing the same data "
+                             "as a memory-mapped index")
+    args = parser.parse_args()
+
+    for n in args.sizes:
+        bench(n, args.offense_ratio, args.lookups, args.csv,
+              args.bloom_fp_rate, args.index)
+
+if __name__ == "__main__":
+    main()
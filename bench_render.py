@@ -0,0 +1,225 @@
+import argparse
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from dashboard_render import DashboardRenderer, clip_lines, wrap_text
+
+DASHBOARD_WIDTH = 760
+# The layout lane_window.py draws
+STATUS_LINES = 1
+SMALL_SCALE = 0.5
+HELP_MARGIN = 12
+HELP = "ENTER=Process | M=Manual | R=Re-Scan | 1/2/3=Camera | Q=Quit"
+
+# ----------------------------
+# OLD RENDER PATH
+# ----------------------------
+def put_wrapped_text(img, text, x, y, max_width, color, scale=0.7, thickness=2):
+    # What v1.py/v5.py used to run every frame
+    words = text.split(" ")
+    line = ""
+    line_height = int(30 * scale)
+
+    for word in words:
+        test_line = line + word + " "
+        (w, _), _ = cv2.getTextSize(
+            test_line, cv2.FONT_HERSHEY_SIMPLEX, scale, thickness
+        )
+
+        if w > max_width:
+            cv2.putText(img, line, (x, y),
+                        cv2.FONT_HERSHEY_SIMPLEX, scale, color, thickness)
+            y += line_height
+            line = word + " "
+        else:
+            line = test_line
+
+    if line:
+        cv2.putText(img, line, (x, y),
+                    cv2.FONT_HERSHEY_SIMPLEX, scale, color, thickness)
+        y += line_height
+
+    return y
+
+def render_full(frame, dashboard, stats, total_cash):
+    h, w, _ = frame.shape
+    canvas = np.zeros((h, w + DASHBOARD_WIDTH, 3), dtype=np.uint8)
+    canvas[:, :w] = frame
+
+    cv2.rectangle(canvas, (w, 0), (w + DASHBOARD_WIDTH, h), (30, 30, 30), -1)
+    x, y = w + 20, 45
+
+    def put(t, c=(255,255,255)):
+        nonlocal y
+        cv2.putText(canvas, t, (x, y), cv2.FONT_HERSHEY_SIMPLEX, 0.7, c, 2)
+        y += 32
+
+    put("SMART TOLL GATE", (0,255,255))
+    put(f"Plate: {dashboard['plate']}")
+    y = put_wrapped_text(canvas, f"Status: {dashboard['status']}", x, y,
+                         DASHBOARD_WIDTH - 40, (0,0,255))
+    put("")
+    put(f"Payment: {dashboard['payment']}")
+    put(f"Cash Collected: {dashboard['cash']}")
+    put(f"Total Cash: INR {total_cash}")
+    y += 10
+    put(f"Approved: {stats['approved']}", (0,255,0))
+    put(f"Rejected: {stats['rejected']}", (0,0,255))
+    put(f"Manual Approved: {stats['manual_approved']}", (255,255,0))
+    y += 10
+    put("ENTER=Process | M=Manual | R=Re-Scan", (180,180,180))
+    put("1/2/3=Camera | Q=Quit", (180,180,180))
+    return canvas
+
+# ----------------------------
+# INCREMENTAL RENDER PATH
+# ----------------------------
+def dashboard_rows(dashboard, stats, total_cash):
+    rows = []
+    y = 77
+
+    def put(t, c=(255,255,255)):
+        nonlocal y
+        rows.append((y, t, c))
+        y += 32
+
+    put(f"Plate: {dashboard['plate']}")
+    status = wrap_text(f"Status: {dashboard['status']}", DASHBOARD_WIDTH - 40)
+    status = clip_lines(status, STATUS_LINES, DASHBOARD_WIDTH - 40)
+    rows.append((y, status, (0,0,255)))
+    y += (STATUS_LINES - 1) * 21 + 32
+    put(f"Payment: {dashboard['payment']}")
+    put(f"Cash Collected: {dashboard['cash']}")
+    put(f"Total Cash: INR {total_cash}")
+    y += 10
+    put(f"Approved: {stats['approved']}", (0,255,0))
+    put(f"Rejected: {stats['rejected']}", (0,0,255))
+    put(f"Manual Approved: {stats['manual_approved']}", (255,255,0))
+    return rows
+
+def static_rows(height):
+    return [(45, "SMART TOLL GATE", (0,255,255)),
+            (height - HELP_MARGIN, HELP, (180,180,180), SMALL_SCALE)]
+
+# ----------------------------
+# BENCHMARK
+# ----------------------------
+def simulate(frames, change_every):
+    # A dashboard that changes every `change_every` frames, like a lane
+    # seeing a vehicle every few seconds
+    dashboard = {"plate": "-", "status": "Waiting for vehicle",
+                 "payment": "-", "cash": "NO"}
+    stats = {"approved": 0, "rejected": 0, "manual_approved": 0}
+    for i in range(frames):
+        if i and i % change_every == 0:
+            stats["rejected"] += 1
+            dashboard["plate"] = f"KA66EF{6000 + i % 1000}"
+            dashboard["status"] = ("REJECTED | Criminal Record, Traffic "
+                                   f"Violation, Insurance Expired | {i}")
+        yield dashboard, stats, 50 * stats["approved"]
+
+def timed(render, frame, frames, change_every):
+    timings = []
+    for dashboard, stats, cash in simulate(frames, change_every):
+        t0 = time.perf_counter()
+        render(frame, dashboard, stats, cash)
+        timings.append(time.perf_counter() - t0)
+    return np.array(timings) * 1e3
+
+def bench(width, height, frames, change_every):
+    rng = np.random.default_rng(3)
+    frame = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+
+    renderer = DashboardRenderer(DASHBOARD_WIDTH, static_rows=static_rows)
+
+    def render_incremental(frame, dashboard, stats, cash):
+        renderer.canvas_for(frame)
+        renderer.draw(dashboard_rows(dashboard, stats, cash))
+
+    full = timed(render_full, frame, frames, change_every)
+    incremental = timed(render_incremental, frame, frames, change_every)
+
+    print(f"--- {width}x{height}, {frames} frames, dashboard changes every "
+          f"{change_every} frames ---")
+    for name, t in (("full redraw", full), ("incremental", incremental)):
+        print(f"{name:12s}  mean {t.mean():.3f} ms  "
+              f"p50 {np.percentile(t, 50):.3f} ms  "
+              f"p99 {np.percentile(t, 99):.3f} ms")
+    print(f"speedup       {full.mean() / incremental.mean():.1f}x "
+          f"({renderer.redrawn} rows redrawn)")
+
+# ----------------------------
+# FROZEN FRAME
+# ----------------------------
+def draw_overlays(view):
+    # The banner, plate box and gate status v1.py draws over the camera
+    h, w = view.shape[:2]
+    cv2.rectangle(view, (0, 0), (w, 70), (0, 0, 0), -1)
+    cv2.putText(view, "PLEASE PAY TOLL CHARGES : INR 50", (int(w * 0.15), 45),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 255, 255), 3)
+    cv2.rectangle(view, (int(w*0.25), int(h*0.45)), (int(w*0.75), int(h*0.65)),
+                  (0, 255, 0), 2)
+    cv2.rectangle(view, (10, h - 60), (260, h - 10), (0, 0, 0), -1)
+    cv2.putText(view, "GATE : CLOSED", (20, h - 25), cv2.FONT_HERSHEY_SIMPLEX,
+                0.9, (0, 0, 255), 3)
+
+def freeze_copying(renderer, frozen):
+    # What v1.py did while a plate was pending: copy the frozen frame,
+    # copy it again into the canvas and redraw every overlay
+    frame = frozen.copy()
+    canvas = renderer.canvas_for(frame)
+    draw_overlays(canvas[:, :frame.shape[1]])
+
+def freeze_cached(renderer, frozen):
+    renderer.camera(frozen, ("CLOSED", True), draw_overlays)
+
+def allocations(tick, frames):
+    # Mean bytes allocated per tick (peak above the starting point)
+    tracemalloc.start()
+    total = 0
+    for _ in range(frames):
+        current = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        tick()
+        total += tracemalloc.get_traced_memory()[1] - current
+    tracemalloc.stop()
+    return total / frames
+
+def bench_freeze(width, height, frames):
+    rng = np.random.default_rng(3)
+    frozen = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+
+    print(f"--- frozen frame, {width}x{height}, {frames} ticks ---")
+    for name, render in (("copying", freeze_copying),
+                         ("cached", freeze_cached)):
+        renderer = DashboardRenderer(DASHBOARD_WIDTH)
+        render(renderer, frozen)
+        timings = []
+        for _ in range(frames):
+            t0 = time.perf_counter()
+            render(renderer, frozen)
+            timings.append(time.perf_counter() - t0)
+        t = np.array(timings) * 1e3
+        allocated = allocations(lambda: render(renderer, frozen), frames)
+        print(f"{name:12s}  mean {t.mean():.3f} ms  "
+              f"p99 {np.percentile(t, 99):.3f} ms  "
+              f"{allocated / 1024:.1f} KiB allocated per tick")
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark full vs incremental dashboard rendering "
+                    "and the frozen-frame path")
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--frames", type=int, default=600)
+    parser.add_argument("--change-every", type=int, default=30)
+    args = parser.parse_args()
+
+    bench(args.width, args.height, args.frames, args.change_every)
+    bench_freeze(args.width, args.height, args.frames)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+import argparse
+import csv
+import io
+import json
+import sys
+import time
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from records import (CATEGORY_BITS, OFFENSES, PLATE_WIDTH, UNREGISTERED,
+                     check_many, load_records, offense_labels)
+from vehicle_db import demo_records
+
+# ----------------------------
+# STREAMING INPUT
+# ----------------------------
+# Files are read in blocks of whole lines, so memory stays at a few
+# blocks whatever the file size, and every block is parsed and checked
+# with array operations instead of a Python loop per row.
+CHUNK_BYTES = 8 * 2**20
+
+def read_blocks(f, chunk_bytes=CHUNK_BYTES):
+    # Blocks of complete lines, each ending in a newline
+    rest = b""
+    while True:
+        data = f.read(chunk_bytes)
+        if not data:
+            break
+        data = rest + data
+        cut = data.rfind(b"\n") + 1
+        rest = data[cut:]
+        if cut:
+            yield data[:cut]
+    if rest:
+        yield rest + b"\n"
+
+def csv_plates(block, column):
+    # Plate column of every line as a fixed-width byte array for
+    # encode_plates(): trimmed of spaces and "\r", upper-cased; short rows
+    # give an empty plate and blank lines none at all. Returns (plates,
+    # line starts, line ends).
+    # Blocks with quoting go through the csv module instead (quoted_plates).
+    if b'"' in block:
+        return quoted_plates(block, column)
+    width = PLATE_WIDTH + 1
+    # Padded so a plate-width window fits after any position
+    buf = np.frombuffer(block + bytes(width), dtype=np.uint8)
+    text = buf[:len(block)]
+
+    # Every separator, and which of them end a line: the separators of a
+    # line run from just after the previous newline up to its own one
+    seps = np.flatnonzero((text == ord(",")) | (text == ord("\n")))
+    newline = np.flatnonzero(text[seps] == ord("\n"))
+    ends = seps[newline]
+    first = np.empty_like(newline)
+    first[:1] = 0
+    first[1:] = newline[:-1] + 1
+    starts = np.empty_like(ends)
+    starts[:1] = 0
+    starts[1:] = ends[:-1] + 1
+
+    # Lines of nothing but spaces and "\r" are dropped
+    ink = np.zeros(len(text) + 1, dtype=np.int64)
+    np.cumsum((text != ord(" ")) & (text != ord("\r")) & (text != ord("\n")),
+              out=ink[1:])
+    filled = ink[ends] > ink[starts]
+    if not filled.all():
+        newline, ends, first, starts = (newline[filled], ends[filled],
+                                        first[filled], starts[filled])
+
+    # Field `column` runs from after the line's column-th separator to
+    # the next one
+    last = first + column
+    found = last <= newline
+    last[~found] = newline[~found]
+    end = seps[last]
+    if column:
+        begin = seps[last - 1] + 1
+    else:
+        begin = starts.copy()
+    begin[~found] = end[~found]
+
+    while True:
+        c = buf[end - 1]
+        pad = (end > begin) & ((c == ord("\r")) | (c == ord(" ")))
+        if not pad.any():
+            break
+        end[pad] -= 1
+    while True:
+        pad = (end > begin) & (buf[begin] == ord(" "))
+        if not pad.any():
+            break
+        begin[pad] += 1
+
+    chars = sliding_window_view(buf, width)[begin]
+    chars *= np.arange(width) < (end - begin)[:, None]
+    chars -= 32 * ((chars >= ord("a")) & (chars <= ord("z"))).view(np.uint8)
+    return chars.view(f"S{width}").ravel(), starts, ends
+
+def quoted_plates(block, column):
+    # csv_plates() for blocks with quoted fields, parsed line by line with
+    # the csv module (quoted fields spanning lines are not supported)
+    lines = block.split(b"\n")[:-1]
+    ends = np.cumsum([len(line) + 1 for line in lines]) - 1
+    starts = ends - [len(line) for line in lines]
+    filled = [i for i, line in enumerate(lines) if line.strip()]
+    lines = [lines[i] for i in filled]
+    starts, ends = starts[filled], ends[filled]
+    rows = csv.reader(line.decode("utf-8", "replace") for line in lines)
+    plates = [row[column].strip().upper() if len(row) > column else ""
+              for row in rows]
+    return plates, starts, ends
+
+# ----------------------------
+# VERDICT TEXT
+# ----------------------------
+# Output columns for every possible mask, built once
+def verdict_columns(mask):
+    labels = offense_labels(mask)
+    verdict = "REJECTED" if labels else "APPROVED"
+    return f"{verdict},{mask},{'|'.join(labels)}".encode()
+
+COLUMNS = [verdict_columns(mask) for mask in range(UNREGISTERED * 2)]
+
+# ----------------------------
+# RECONCILIATION
+# ----------------------------
+class Tally:
+    def __init__(self):
+        self.rows = 0
+        self.rejected = 0
+        self.changed = 0
+        self.written = 0
+        self.bits = {bit: 0 for bit, _, _ in OFFENSES}
+        self.bits[UNREGISTERED] = 0
+
+    def add(self, masks):
+        self.rows += len(masks)
+        self.rejected += int(np.count_nonzero(masks))
+        for bit in self.bits:
+            self.bits[bit] += int(np.count_nonzero(masks & bit))
+
+def selected(masks, offense_mask, rejected_only):
+    if offense_mask:
+        return (masks & offense_mask) != 0
+    if rejected_only:
+        return masks != 0
+    return None
+
+def run_csv(store, f, out, column, header, offense_mask, rejected_only,
+            tally):
+    if header:
+        first = f.readline().rstrip(b"\r\n")
+        if not first:
+            return
+        names = [n.strip().lower() for n in
+                 next(csv.reader([first.decode("utf-8", "replace")]))]
+        if not isinstance(column, int):
+            if column not in names:
+                sys.exit(f"no column {column!r} in the header")
+            column = names.index(column)
+        out.write(first + b",verdict,mask,offenses\n")
+    elif not isinstance(column, int):
+        column = 0
+
+    for block in read_blocks(f):
+        plates, starts, ends = csv_plates(block, column)
+        _, masks = check_many(store, plates)
+        tally.add(masks)
+
+        keep = selected(masks, offense_mask, rejected_only)
+        if keep is not None:
+            starts, ends, masks = starts[keep], ends[keep], masks[keep]
+        written = [block[s:e].rstrip(b"\r") + b"," + COLUMNS[m] + b"\n"
+                   for s, e, m in zip(starts.tolist(), ends.tolist(),
+                                      masks.tolist())]
+        out.write(b"".join(written))
+        tally.written += len(written)
+
+def journal_verdicts(block):
+    # Verdict events of a block of journal lines; torn lines are skipped
+    # as replay skips them
+    events = []
+    for line in block.split(b"\n"):
+        if b'"type":"verdict"' not in line:
+            continue
+        try:
+            event = json.loads(line)
+        except ValueError:
+            continue
+        if isinstance(event, dict) and event.get("type") == "verdict":
+            events.append(event)
+    return events
+
+def run_journal(store, f, out, offense_mask, rejected_only, changed_only,
+                tally):
+    # Every verdict the lanes gave, re-checked against today's records:
+    # the plate a fuzzy match used where there was one, else the plate
+    # read.
+    # Manual approvals were the operator's call, not a records verdict, so
+    # they are listed but never count as changed. Events journaled with
+    # their mask are compared on it, older ones on approved/rejected.
+    text = io.TextIOWrapper(out, encoding="utf-8", newline="",
+                            write_through=True)
+    writer = csv.writer(text, lineterminator="\n")
+    writer.writerow(["ts", "lane", "plate", "matched", "manual",
+                     "verdict_then", "verdict", "mask", "offenses"])
+    for block in read_blocks(f):
+        events = journal_verdicts(block)
+        if not events:
+            continue
+        plates = [str(e.get("matched") or e["plate"]) for e in events]
+        _, masks = check_many(store, plates)
+        tally.add(masks)
+        manual = np.array([bool(e.get("manual")) for e in events])
+        then = np.array([e["mask"] if isinstance(e.get("mask"), int)
+                         else -1 for e in events])
+        approved_then = np.array([e.get("verdict") == "APPROVED"
+                                  for e in events])
+        changed = np.where(then >= 0, then != masks,
+                           approved_then != (masks == 0))
+        changed &= ~manual
+        tally.changed += int(np.count_nonzero(changed))
+
+        keep = selected(masks, offense_mask, rejected_only)
+        if keep is None:
+            keep = np.ones(len(masks), dtype=bool)
+        if changed_only:
+            keep &= changed
+        rows = np.flatnonzero(keep).tolist()
+        for i in rows:
+            event = events[i]
+            writer.writerow([event["ts"], event["lane"], event["plate"],
+                             event.get("matched") or "",
+                             "yes" if manual[i] else "no", event["verdict"],
+                             *COLUMNS[masks[i]].decode().split(",", 2)])
+        tally.written += len(rows)
+    # Leave `out` open for the caller
+    text.detach()
+
+# ----------------------------
+# MAIN
+# ----------------------------
+def main():
+    parser = argparse.ArgumentParser(
+        description="Re-check plates from a passage CSV or a transaction "
+                    "journal against the current records, streaming")
+    parser.add_argument("input",
+                        help="CSV of passages or a .jsonl journal ('-' for "
+                             "CSV on stdin)")
+    parser.add_argument("--records",
+                        help="records file, directory or .tgx index "
+                             "(default: demo lists)")
+    parser.add_argument("--output", help="CSV to write (default stdout)")
+    parser.add_argument("--column", default="plate",
+                        help="plate column name, or index with --no-header")
+    parser.add_argument("--no-header", action="store_true",
+                        help="the CSV has no header row")
+    parser.add_argument("--offense", nargs="+", choices=sorted(CATEGORY_BITS)
+                        + ["unregistered"],
+                        help="only write rows flagged with these")
+    parser.add_argument("--rejected-only", action="store_true",
+                        help="only write rows the records now reject")
+    parser.add_argument("--changed", action="store_true",
+                        help="journal: only write verdicts that would now "
+                             "come out differently")
+    args = parser.parse_args()
+
+    store = load_records(args.records) if args.records else demo_records()
+    offense_mask = 0
+    for name in args.offense or ():
+        offense_mask |= (UNREGISTERED if name == "unregistered"
+                         else CATEGORY_BITS[name])
+    column = int(args.column) if args.column.isdigit() else args.column
+
+    journal = args.input.endswith(".jsonl")
+    f = sys.stdin.buffer if args.input == "-" else open(args.input, "rb")
+    out = open(args.output, "wb") if args.output else sys.stdout.buffer
+    tally = Tally()
+    t0 = time.perf_counter()
+    try:
+        if journal:
+            run_journal(store, f, out, offense_mask, args.rejected_only,
+                        args.changed, tally)
+        else:
+            run_csv(store, f, out, column, not args.no_header, offense_mask,
+                    args.rejected_only, tally)
+    finally:
+        if f is not sys.stdin.buffer:
+            f.close()
+        if out is not sys.stdout.buffer:
+            out.close()
+        else:
+            out.flush()
+    elapsed = time.perf_counter() - t0
+
+    names = {bit: label for bit, _, label in OFFENSES}
+    names[UNREGISTERED] = "Invalid License"
+    print(f"{tally.rows:,} plates in {elapsed:.2f}s "
+          f"({tally.rows / max(elapsed, 1e-9) / 1e6:.2f}M/s), "
+          f"{tally.rejected:,} rejected, {tally.written:,} rows written",
+          file=sys.stderr)
+    if journal:
+        print(f"{tally.changed:,} verdicts would now differ", file=sys.stderr)
+    for bit, n in tally.bits.items():
+        if n:
+            print(f"  {names[bit]:20s} {n:,}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+import os
+import threading
+import time
+
+import cv2
+
+from replay import ReplaySource
+
+# ----------------------------
+# SOURCES
+# ----------------------------
+def open_source(source):
+    # Camera indices are given as plain numbers, a directory is replayed
+    # as an image sequence, anything else is a video path or stream URL
+    source = str(source)
+    if os.path.isdir(source):
+        return ReplaySource(source)
+    return cv2.VideoCapture(int(source) if source.isdigit() else source)
+
+def source_fps(cap, source):
+    # Video files and image directories are paced at their own frame
+    # rate; cameras and streams already deliver frames in real time
+    if os.path.exists(str(source)):
+        return cap.get(cv2.CAP_PROP_FPS) or None
+    return None
+
+# ----------------------------
+# CAMERA SOURCE
+# ----------------------------
+# A frame whose capture timestamp is older than this many frame intervals
+# when grab() returns it sat in the driver queue, so a newer one is behind
+STALE_INTERVALS = 1.5
+# Without timestamps: a grab() that returns faster than this did not wait
+# for the camera, so with a driver buffer of more than one frame it came
+# from the queue
+DRAIN_SECONDS = 0.002
+# Queued frames skipped in a row before one is decoded anyway
+MAX_DRAIN = 8
+# A backend timestamp (CAP_PROP_POS_MSEC) is taken as the capture time
+# when it reads as the monotonic clock no more than this long ago; V4L2
+# cameras report it that way, files and streams give a position instead
+MAX_STAMP_AGE = 5.0
+
+class CameraSource:
+    # One camera kept open and read on its own thread; only the newest
+    # frame is kept, so nothing that reads it ever waits on cap.read().
+    #
+    # Live sources are read with grab(), and frames that piled up in the
+    # driver buffer (after a stall or a slow decode) are skipped without
+    # retrieve(). A frame is known to be queued when the backend's capture
+    # timestamp is more than STALE_INTERVALS frame intervals old; backends
+    # without one are only drained with a driver buffer of more than one
+    # frame, and then by how fast grab() returned.
+    #
+    # Every frame that is not skipped is still decoded here, on the
+    # capture thread, whether or not a reader ever takes it: retrieve()
+    # has to run on the thread that grab()s, and handing it to read()
+    # would make readers wait on the camera again. The cost is one decode
+    # per delivered frame at the camera's rate (about 3 ms for a 1080p
+    # MJPEG frame), off the lane's thread.
+    #
+    # age() is the time since the current frame was captured where the
+    # backend timestamps frames, otherwise since grab()/read() returned
+    # it (time spent queued in the driver then does not show). `drained`
+    # counts frames skipped in the driver buffer and `dropped` decoded
+    # frames replaced before anyone read them.
+    #
+    # `source` is what open_source() takes (camera index, video path,
+    # stream URL, image directory) or an already opened capture. On open
+    # the capture gets the requested width/height/fps and buffer size
+    # (cameras that cannot do them keep their own). When a read fails the
+    # capture is released and reopened after `backoff` seconds, doubling
+    # up to `max_backoff` while it keeps failing; meanwhile read() reports
+    # the source offline. Files and image directories just end, and an
+    # opened capture cannot be reopened.
+    #
+    # `pace` plays a recording back at that many frames per second
+    # instead of as fast as it decodes; local files default to their own
+    # rate.
+
+    def __init__(self, source, width=None, height=None, fps=None,
+                 buffer_size=1, pace=None, backoff=0.5, max_backoff=10.0):
+        if hasattr(source, "read"):
+            self.source, self.cap = None, source
+        else:
+            self.source, self.cap = source, None
+        self.settings = ((cv2.CAP_PROP_FRAME_WIDTH, width),
+                         (cv2.CAP_PROP_FRAME_HEIGHT, height),
+                         (cv2.CAP_PROP_FPS, fps),
+                         (cv2.CAP_PROP_BUFFERSIZE, buffer_size))
+        self.buffer_size = buffer_size
+        self.pace = pace
+        self.reconnect = (self.source is not None
+                          and not os.path.exists(str(self.source)))
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+        self.lock = threading.Lock()
+        self.frame = None
+        self.seq = 0
+        self.captured_at = None
+        self.stamped = False
+        self.taken = 0
+        self.drained = 0
+        self.dropped = 0
+        self.online = False
+        self.ended = False
+        self.opens = 0
+        self.failures = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self, timeout=2.0):
+        # Returns once the first frame is in, the source has given up, or
+        # after `timeout` seconds
+        self._thread.start()
+        self.wait(timeout)
+        return self
+
+    def wait(self, timeout):
+        deadline = time.time() + timeout
+        while (self.seq == 0 and not self.ended and time.time() < deadline
+               and not self._stop.is_set()):
+            time.sleep(0.01)
+        return self.online
+
+    def _open(self):
+        cap, self.cap = self.cap, None
+        if cap is None:
+            if self.source is None:
+                return None
+            cap = open_source(self.source)
+        if not cap.isOpened():
+            cap.release()
+            return None
+        if hasattr(cap, "set"):
+            for prop, value in self.settings:
+                if value:
+                    cap.set(prop, value)
+        if self.pace is None and self.source is not None:
+            self.pace = source_fps(cap, self.source)
+        self.opens += 1
+        return cap
+
+    def _run(self):
+        cap = None
+        delay = self.backoff
+        while not self._stop.is_set():
+            if cap is None:
+                cap = self._open()
+                if cap is None:
+                    if not self._retry(delay):
+                        break
+                    delay = min(delay * 2, self.max_backoff)
+                    continue
+                interval = 1.0 / self.pace if self.pace else 0.0
+                next_at = time.perf_counter()
+                # A paced recording has no live edge to catch up with
+                live = not interval and hasattr(cap, "grab")
+                queued = 0
+                last_stamp = None
+                frame_interval = 0.0
+
+            if interval:
+                next_at += interval
+                wait = next_at - time.perf_counter()
+                if wait > 0:
+                    time.sleep(wait)
+            stamp = None
+            if live:
+                t0 = time.monotonic()
+                ret = cap.grab()
+                returned = time.monotonic()
+                if ret:
+                    stamp = capture_stamp(cap, returned)
+                if stamp is not None:
+                    if last_stamp is not None and stamp > last_stamp:
+                        # Smoothed, so one late frame does not move it much
+                        delta = stamp - last_stamp
+                        frame_interval = (delta if not frame_interval else
+                                          0.9 * frame_interval + 0.1 * delta)
+                    last_stamp = stamp
+                    stale = (frame_interval and returned - stamp
+                             > STALE_INTERVALS * frame_interval)
+                else:
+                    stale = ((self.buffer_size or 0) > 1
+                             and returned - t0 < DRAIN_SECONDS)
+                if ret and stale and queued < MAX_DRAIN:
+                    queued += 1
+                    self.drained += 1
+                    continue
+                queued = 0
+                if ret:
+                    ret, frame = cap.retrieve()
+            else:
+                ret, frame = cap.read()
+                returned = time.monotonic()
+            if not ret:
+                cap.release()
+                cap = None
+                with self.lock:
+                    self.online = False
+                if not self._retry(delay):
+                    break
+                delay = min(delay * 2, self.max_backoff)
+                continue
+
+            delay = self.backoff
+            with self.lock:
+                if self.seq and self.taken != self.seq:
+                    self.dropped += 1
+                self.frame = frame
+                self.seq += 1
+                self.captured_at = returned if stamp is None else stamp
+                self.stamped = stamp is not None
+                self.online = True
+        if cap is not None:
+            cap.release()
+
+    def _retry(self, delay):
+        # Whether to try opening again, after waiting out the backoff
+        self.failures += 1
+        if not self.reconnect:
+            self.ended = True
+            return False
+        return not self._stop.wait(delay)
+
+    def read(self):
+        # (ok, newest frame, its sequence number); not ok while offline
+        with self.lock:
+            self.taken = self.seq
+            return self.online, self.frame, self.seq
+
+    def age(self):
+        # Seconds since the current frame was captured (see above), or None
+        with self.lock:
+            captured_at = self.captured_at
+        if captured_at is None:
+            return None
+        return time.monotonic() - captured_at
+
+    def stop(self):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout=1.0)
+
+def capture_stamp(cap, now):
+    # The backend's capture time of the grabbed frame on the monotonic
+    # clock, or None when it does not give one
+    msec = cap.get(cv2.CAP_PROP_POS_MSEC) if hasattr(cap, "get") else 0.0
+    if msec and 0.0 <= now - msec / 1000.0 <= MAX_STAMP_AGE:
+        return msec / 1000.0
+    return None
+
+# ----------------------------
+# CAMERA POOL
+# ----------------------------
+class CameraPool:
+    # Cameras by name, each kept open and warm from the moment it is
+    # added until it is removed or the pool closes, so a lane switches
+    # back to one instantly instead of releasing one device and
+    # initialising the next. The pool opens nothing by itself: the plaza
+    # adds every source up front, while the lane window adds only the
+    # camera it starts on and the others the first time they are picked,
+    # so that first switch waits for the camera to come up.
+
+    def __init__(self, **settings):
+        # `settings` are CameraSource defaults for every camera
+        self.settings = settings
+        self.sources = {}
+
+    def add(self, name, source, timeout=0.0, **settings):
+        if name in self.sources:
+            raise ValueError(f"camera {name!r} already in the pool")
+        camera = CameraSource(source, **{**self.settings, **settings})
+        self.sources[name] = camera.start(timeout)
+        return camera
+
+    def get(self, name):
+        return self.sources.get(name)
+
+    def remove(self, name):
+        camera = self.sources.pop(name, None)
+        if camera:
+            camera.stop()
+
+    def wait(self, timeout=2.0):
+        # Until every camera has a first frame or gave up, or `timeout`
+        deadline = time.time() + timeout
+        for camera in self.sources.values():
+            camera.wait(max(deadline - time.time(), 0.0))
+
+    def __iter__(self):
+        return iter(self.sources.items())
+
+    def close(self):
+        for camera in self.sources.values():
+            camera.stop()
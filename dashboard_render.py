@@ -0,0 +1,213 @@
+import time
+from functools import lru_cache
+
+import cv2
+import numpy as np
+
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+PANEL_COLOR = (30, 30, 30)
+
+# Text rows are drawn with their baseline at y; a row owns the band from
+# ASCENT above the baseline to DESCENT below it
+ASCENT = 24
+DESCENT = 8
+
+# ----------------------------
+# TEXT WRAPPING
+# ----------------------------
+@lru_cache(maxsize=256)
+def wrap_text(text, max_width, scale=0.7, thickness=2):
+    # Same word wrap put_wrapped_text used to do every frame, measured once
+    # per distinct text
+    lines = []
+    line = ""
+    for word in text.split(" "):
+        test_line = line + word + " "
+        (w, _), _ = cv2.getTextSize(test_line, FONT, scale, thickness)
+        if w > max_width and line:
+            lines.append(line)
+            line = word + " "
+        else:
+            line = test_line
+    if line:
+        lines.append(line)
+    return tuple(lines)
+
+@lru_cache(maxsize=256)
+def clip_lines(lines, max_lines, max_width, scale=0.7, thickness=2):
+    # At most max_lines of wrapped text; when some are cut off the last
+    # line shown loses words until "+N more" fits after it
+    if len(lines) <= max_lines:
+        return lines
+    hidden = len(lines) - max_lines
+    words = lines[max_lines - 1].split()
+    while True:
+        last = " ".join(words + [f"+{hidden} more"])
+        (w, _), _ = cv2.getTextSize(last, FONT, scale, thickness)
+        if w <= max_width or not words:
+            break
+        words.pop()
+    return lines[:max_lines - 1] + (last,)
+
+# ----------------------------
+# DASHBOARD RENDERER
+# ----------------------------
+class DashboardRenderer:
+    # Keeps one canvas per camera resolution instead of allocating a new
+    # one every frame. The panel background and the rows that never change
+    # (title, key help) are rendered once into a static layer; every frame
+    # only the camera area is copied in and only the dashboard rows whose
+    # text or colour changed since the last frame are redrawn, each by
+    # restoring its band from the static layer and putting the new text.
+    #
+    # A row is (y, text, color), where text may be a tuple of lines drawn
+    # line_height apart (a wrapped status), or (y, text, color, scale) for
+    # smaller text: thinner, with its lines and band scaled to match.
+    # `static_rows` may also be a function of the canvas height, for rows
+    # placed from the bottom of the panel.
+    #
+    # camera() also remembers which frame and overlay state the camera
+    # area shows: redisplaying the same frame (a frozen one, or a live one
+    # the camera has not replaced yet) with unchanged overlays copies and
+    # draws nothing.
+
+    def __init__(self, width, static_rows=(), scale=0.7, thickness=2,
+                 line_height=21):
+        self.width = width
+        self.static_rows = (static_rows if callable(static_rows)
+                            else list(static_rows))
+        self.scale = scale
+        self.thickness = thickness
+        self.line_height = line_height
+
+        self.canvas = None
+        self.static = None
+        self.cam_w = None
+        self.drawn = []
+        self.redrawn = 0
+
+        self.shown = None
+        self.shown_overlays = None
+        self.composited = 0
+        self.reused = 0
+
+    def canvas_for(self, frame):
+        # Copies the frame straight into the canvas's camera area
+        h, w = frame.shape[:2]
+        if self.canvas is None or self.canvas.shape[0] != h or self.cam_w != w:
+            self._allocate(h, w)
+        self.canvas[:, :w] = frame
+        self.shown = None
+        return self.canvas
+
+    def camera(self, frame, overlays=None, draw=None):
+        # Puts the frame into the canvas and runs draw(view) on the camera
+        # area, unless the canvas already shows this very frame with equal
+        # `overlays` (a key for whatever the overlays depend on)
+        if frame is self.shown and overlays == self.shown_overlays:
+            self.reused += 1
+            return self.canvas
+        canvas = self.canvas_for(frame)
+        if draw:
+            draw(canvas[:, :self.cam_w])
+        # Holding the frame keeps its identity from being reused
+        self.shown = frame
+        self.shown_overlays = overlays
+        self.composited += 1
+        return canvas
+
+    def _allocate(self, h, w):
+        self.canvas = np.empty((h, w + self.width, 3), dtype=np.uint8)
+        self.cam_w = w
+
+        self.static = np.empty((h, self.width, 3), dtype=np.uint8)
+        self.static[:] = PANEL_COLOR
+        static_rows = self.static_rows
+        if callable(static_rows):
+            static_rows = static_rows(h)
+        for row in static_rows:
+            self._put(self.static, row)
+        self.canvas[:, w:] = self.static
+        self.drawn = []
+
+    def _ratio(self, row):
+        return row[3] / self.scale if len(row) > 3 else 1.0
+
+    def line_step(self, scale=None):
+        # How far apart the lines of a row drawn at `scale` are
+        return round(self.line_height * (scale or self.scale) / self.scale)
+
+    def room(self, y, bottom, scale=None):
+        # How many lines of a row at y, drawn at `scale`, fit above `bottom`
+        descent = round(DESCENT * (scale or self.scale) / self.scale)
+        return max((bottom - descent - y) // self.line_step(scale) + 1, 0)
+
+    def _lines(self, row):
+        y, text = row[:2]
+        lines = text if isinstance(text, tuple) else (text,)
+        step = self.line_step(row[3] if len(row) > 3 else None)
+        return [(y + i * step, line) for i, line in enumerate(lines)]
+
+    def band(self, row):
+        # The panel rows (y0, y1) the row's text covers
+        lines = self._lines(row)
+        ratio = self._ratio(row)
+        return (max(lines[0][0] - round(ASCENT * ratio), 0),
+                lines[-1][0] + round(DESCENT * ratio))
+
+    def _put(self, img, row):
+        ratio = self._ratio(row)
+        thickness = max(1, round(self.thickness * ratio))
+        for y, line in self._lines(row):
+            cv2.putText(img, line, (20, y), FONT, self.scale * ratio, row[2],
+                        thickness)
+
+    def draw(self, rows):
+        panel = self.canvas[:, self.cam_w:]
+        old = self.drawn
+
+        # Rows that changed or disappeared give their band back to the
+        # static layer first, then the changed rows are drawn on top
+        changed = [i for i, row in enumerate(rows)
+                   if i >= len(old) or old[i] != row]
+        for i in changed + list(range(len(rows), len(old))):
+            if i < len(old):
+                y0, y1 = self.band(old[i])
+                panel[y0:y1] = self.static[y0:y1]
+        for i in changed:
+            y0, y1 = self.band(rows[i])
+            panel[y0:y1] = self.static[y0:y1]
+            self._put(panel, rows[i])
+
+        self.redrawn += len(changed)
+        self.drawn = list(rows)
+
+# ----------------------------
+# METRICS OVERLAY
+# ----------------------------
+class MetricsOverlay:
+    # Rolling p50/p95/p99 per stage drawn over the camera view. The
+    # percentiles are recomputed every `refresh` seconds, not per frame.
+
+    def __init__(self, metrics, refresh=0.5):
+        self.metrics = metrics
+        self.refresh = refresh
+        self.lines = []
+        self.updated = 0.0
+
+    def draw(self, img, x, y):
+        now = time.time()
+        if now - self.updated >= self.refresh:
+            self.lines = [
+                f"{stage:10s} {p50:7.2f} {p95:7.2f} {p99:7.2f}"
+                for stage, (p50, p95, p99) in self.metrics.percentiles().items()
+            ]
+            self.lines.insert(0, f"{'ms':10s} {'p50':>7s} {'p95':>7s} "
+                                 f"{'p99':>7s}")
+            self.updated = now
+
+        h = 18 * len(self.lines) + 10
+        cv2.rectangle(img, (x, y), (x + 330, y + h), (0, 0, 0), -1)
+        for i, line in enumerate(self.lines):
+            cv2.putText(img, line, (x + 8, y + 20 + 18 * i),
+                        cv2.FONT_HERSHEY_PLAIN, 1.0, (200, 200, 200), 1)
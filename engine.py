@@ -0,0 +1,285 @@
+import functools
+import time
+
+from camera_pool import CameraPool, CameraSource
+from evidence import EvidenceStore
+from fuzzy_match import FuzzyPlateMatcher, normalize_plate
+from journal import (TransactionJournal, evidence_lost_event, lane_totals,
+                     read_journal)
+from lane import Lane
+from metrics import null_timer
+from ocr_backend import make_ocr_backend
+from ocr_pipeline import OCRWorkerPool
+from plate_detector import PlateDetector
+from preprocess import Preprocessor
+from records import VerdictCache, check_vehicle, is_valid_plate
+from verdict_pipeline import VerdictPipeline
+
+# ----------------------------
+# TOLL GATE ENGINE
+# ----------------------------
+class TollGateEngine:
+    # Runs any number of lanes in one process and has no UI of its own:
+    # the single-lane window (v1.py/v5.py), the plaza view and the
+    # headless server all drive an engine and only differ in how they
+    # show it and take operator input.
+    #
+    # Everything the engine talks to is passed in:
+    #   source    per lane, a camera index, video path, stream URL or
+    #             image directory, an opened capture (cv2.VideoCapture, a
+    #             ReplaySource), or a CameraSource already in `cameras`
+    #   ocr       a backend with read(image) -> (text, confidence) and
+    #             close(), see ocr_backend.py
+    #   check     plate -> records.Verdict, e.g. records.check_vehicle bound
+    #             to a LiveRecords, or a VerdictCache (pass it as `cache`
+    #             too for its counters)
+    #   sinks     objects with record(event); every plate taken, verdict
+    #             and manual approval is handed to each of them (a
+    #             TransactionJournal is one)
+    #
+    # Lane counters start from `totals` ({lane: (stats, cash)}, e.g. from
+    # lane_totals()). Lane sources are kept in `cameras`, a CameraPool
+    # whose `camera` settings (width, height, fps, buffer_size) apply to
+    # every source; spare cameras can be added there for lanes to switch
+    # to. The engine closes the cameras, the OCR backend, the sinks and
+    # the evidence store with itself.
+
+    def __init__(self, ocr, check, validate=is_valid_plate, workers=2,
+                 max_pending=2, verdict_workers=2, detector=None,
+                 preprocess=None, sinks=(), evidence=None, totals=None,
+                 sound=True, timer=null_timer, cache=None, camera=None):
+        self.validate = validate
+        self.cameras = CameraPool(**(camera or {}))
+        self.cache = cache
+        self.sinks = list(sinks)
+        self.evidence = evidence
+        if evidence is not None:
+            evidence.on_lost = self._evidence_lost
+        self.totals = totals or {}
+        self.sound = sound
+        self.timer = timer
+
+        self.ocr_pool = OCRWorkerPool(
+            ocr, workers=workers, max_pending=max_pending, timer=timer,
+            detector=detector,
+            accept=lambda t: validate(normalize_plate(t)),
+            preprocess=preprocess)
+        self.verdicts = VerdictPipeline(check, workers=verdict_workers)
+
+        self.lanes = []
+        self.by_name = {}
+        # {lane name: (camera, name, opened here, deadline, done)}
+        self.switches = {}
+
+    def add_lane(self, name, source, pace=None,
+                 roi=(0.25, 0.45, 0.75, 0.65), reset_delay_approved=5,
+                 reset_delay_rejected=30, auto_process=False, timeout=2.0):
+        # A new source joins `cameras` under the lane's name; `pace` plays
+        # an opened recording back at that rate. Lanes find plates with
+        # the pool's detector when it has one.
+        if not isinstance(source, CameraSource):
+            source = self.cameras.add(name, source, pace=pace)
+            source.wait(timeout)
+        lane = Lane(name, source, self.ocr_pool, self.verdicts, self.validate,
+                    roi=roi, reset_delay_approved=reset_delay_approved,
+                    reset_delay_rejected=reset_delay_rejected,
+                    sound=self.sound, timer=self.timer,
+                    detect=self.ocr_pool.detector is not None,
+                    sinks=self.sinks, evidence=self.evidence,
+                    auto_process=auto_process)
+        if name in self.totals:
+            stats, lane.total_cash = self.totals[name]
+            lane.stats = dict(stats)
+        self.lanes.append(lane)
+        self.by_name[name] = lane
+        return lane
+
+    def _evidence_lost(self, evidence_id, reason):
+        # The journal already points at this id; say it was never written
+        event = evidence_lost_event(evidence_id, reason)
+        for sink in self.sinks:
+            sink.record(event)
+
+    # ---------------- CAMERA SWITCHING ----------------
+    def switch_camera(self, lane, name, source=None, timeout=5.0, done=None):
+        # Moves `lane` to camera `name` as soon as it delivers frames and
+        # returns at once; a camera not yet in `cameras` is opened from
+        # `source` (default: `name`) on its own thread. After `timeout`
+        # seconds without frames the switch is given up and a camera
+        # opened for it closed again. done(lane, name, ok) is called from
+        # step() with the outcome.
+        camera = self.cameras.get(name)
+        opened = camera is None
+        # A switch still waiting on a camera it opened is replaced; that
+        # camera is closed unless it is the one asked for again
+        pending = self.switches.pop(lane.name, None)
+        if pending and pending[2]:
+            if pending[1] == name:
+                opened = True
+            elif not pending[0].online:
+                self.cameras.remove(pending[1])
+        if camera is None:
+            camera = self.cameras.add(name,
+                                      name if source is None else source)
+        self.switches[lane.name] = (camera, name, opened,
+                                    time.monotonic() + timeout, done)
+
+    def _finish_switches(self):
+        now = time.monotonic()
+        for lane_name, switch in list(self.switches.items()):
+            camera, name, opened, deadline, done = switch
+            lane = self.by_name[lane_name]
+            if camera.online:
+                if camera is not lane.source:
+                    lane.switch_source(camera)
+                ok = True
+            elif camera.ended or now >= deadline:
+                if opened:
+                    self.cameras.remove(name)
+                ok = False
+            else:
+                continue
+            del self.switches[lane_name]
+            if done:
+                done(lane, name, ok)
+
+    # ---------------- FRAME STEP ----------------
+    def step(self):
+        # One tick: finish camera switches, hand finished OCR reads to
+        # their lanes, then let every lane apply verdicts, run its timers
+        # and capture
+        if self.switches:
+            self._finish_switches()
+        for tag, plate, confidence, box, frame in self.ocr_pool.poll():
+            lane = self.by_name.get(tag)
+            if lane:
+                lane.on_ocr(plate, confidence, frame, box)
+        for lane in self.lanes:
+            lane.step()
+
+    # ---------------- METRICS ----------------
+    def export(self, metrics, records=None):
+        # Lane counters, cash and capture state labelled by lane, plus the
+        # shared pool and records, read at scrape time
+        for lane in self.lanes:
+            for outcome in lane.stats:
+                metrics.value("toll_vehicles",
+                              lambda lane=lane, outcome=outcome:
+                                  lane.stats[outcome],
+                              "Vehicles by outcome",
+                              labels={"lane": lane.name, "outcome": outcome})
+        for lane in self.lanes:
+            metrics.value("toll_cash_inr", lambda lane=lane: lane.total_cash,
+                          "Toll cash collected", labels={"lane": lane.name})
+        for lane in self.lanes:
+            metrics.value("toll_lane_online", lambda lane=lane: lane.online,
+                          "Lane camera delivering frames",
+                          labels={"lane": lane.name})
+        for name, camera in self.cameras:
+            metrics.value("toll_camera_reconnects_total",
+                          lambda camera=camera: max(camera.opens - 1, 0),
+                          "Camera reopens after a failed read", "counter",
+                          labels={"camera": str(name)})
+        for name, camera in self.cameras:
+            metrics.value("toll_camera_frame_age_seconds", camera.age,
+                          "Time since the newest frame was grabbed",
+                          labels={"camera": str(name)})
+        for name, camera in self.cameras:
+            metrics.value("toll_camera_drained_frames_total",
+                          lambda camera=camera: camera.drained,
+                          "Stale frames skipped in the driver buffer",
+                          "counter", labels={"camera": str(name)})
+        for name, camera in self.cameras:
+            metrics.value("toll_camera_dropped_frames_total",
+                          lambda camera=camera: camera.dropped,
+                          "Frames replaced before a lane read them",
+                          "counter", labels={"camera": str(name)})
+        for lane in self.lanes:
+            metrics.value("toll_ocr_frames_total",
+                          lambda lane=lane: lane.motion_gate.passed,
+                          "Frames sent to OCR", "counter",
+                          labels={"lane": lane.name})
+        for lane in self.lanes:
+            metrics.value("toll_ocr_skipped_total",
+                          lambda lane=lane: lane.motion_gate.skipped,
+                          "Frames skipped by the motion gate", "counter",
+                          labels={"lane": lane.name})
+        pool = self.ocr_pool
+        metrics.value("toll_ocr_submitted_total", lambda: pool.submitted,
+                      "OCR jobs submitted", "counter")
+        metrics.value("toll_ocr_dropped_total", lambda: pool.dropped,
+                      "OCR jobs dropped for newer frames", "counter")
+        metrics.value("toll_ocr_errors_total", lambda: pool.errors,
+                      "OCR reads that raised", "counter")
+        cache = self.cache
+        if cache is not None:
+            metrics.value("toll_verdict_cache_hits_total", lambda: cache.hits,
+                          "Verdicts served from the cache", "counter")
+            metrics.value("toll_verdict_cache_misses_total",
+                          lambda: cache.misses,
+                          "Verdicts that needed a records lookup", "counter")
+            metrics.value("toll_verdict_cache_plates", lambda: len(cache),
+                          "Plates in the verdict cache")
+        if records is not None:
+            metrics.value("toll_records_version", lambda: records.version,
+                          "Records snapshot version")
+            metrics.value("toll_records_plates", lambda: len(records),
+                          "Plates in the records snapshot")
+
+    def close(self):
+        self.cameras.close()
+        self.ocr_pool.close()
+        self.verdicts.close()
+        if self.evidence:
+            self.evidence.close()
+        for sink in self.sinks:
+            close = getattr(sink, "close", None)
+            if close:
+                close()
+
+# ----------------------------
+# ENGINE SETUP
+# ----------------------------
+def build_engine(records, ocr="auto", workers=2, max_pending=2,
+                 verdict_workers=2, detect=False, preprocess="auto",
+                 fuzzy_min_confidence=0.8, verdict_cache=4096, journal=None,
+                 journal_fsync="interval", evidence_dir=None,
+                 evidence_format="jpg", evidence_quota_mb=2048, sinks=(),
+                 camera=None, sound=True, metrics=None):
+    # An engine from plain settings, as the scripts and command lines
+    # give them. Lookups go to `records` (a LiveRecords) with fuzzy
+    # matching unless fuzzy_min_confidence is 0/None, and the last
+    # `verdict_cache` plates' verdicts are kept (0 disables); with a
+    # `journal` path lane counters are restored from it and every event
+    # appended to it; `camera` settings go to every camera source;
+    # `metrics` times the pipeline stages when given.
+    matcher = FuzzyPlateMatcher(records) if fuzzy_min_confidence else None
+    cache = None
+    if verdict_cache:
+        check = cache = VerdictCache(records, matcher, fuzzy_min_confidence,
+                                     maxsize=verdict_cache)
+    else:
+        check = functools.partial(check_vehicle, records, matcher=matcher,
+                                  min_confidence=fuzzy_min_confidence)
+    validate = is_valid_plate
+    if metrics:
+        check = metrics.timed("lookup", check)
+        validate = metrics.timed("regex", validate)
+
+    totals = {}
+    sinks = list(sinks)
+    if journal:
+        totals = lane_totals(read_journal(journal))
+        sinks.insert(0, TransactionJournal(journal, fsync=journal_fsync))
+    evidence = None
+    if evidence_dir:
+        evidence = EvidenceStore(evidence_dir, fmt=evidence_format,
+                                 quota_bytes=evidence_quota_mb * 2**20)
+
+    return TollGateEngine(
+        make_ocr_backend(ocr), check, validate=validate, workers=workers,
+        max_pending=max_pending, verdict_workers=verdict_workers,
+        detector=PlateDetector() if detect else None,
+        preprocess=Preprocessor(preprocess), sinks=sinks, evidence=evidence,
+        totals=totals, sound=sound, timer=metrics or null_timer, cache=cache,
+        camera=camera)
@@ -0,0 +1,178 @@
+import itertools
+import os
+import queue
+import re
+import threading
+import time
+from collections import deque
+
+import cv2
+
+DROP_POLICIES = ("drop_oldest", "drop_newest")
+
+ENCODINGS = {
+    "jpg": (".jpg", cv2.IMWRITE_JPEG_QUALITY),
+    "webp": (".webp", cv2.IMWRITE_WEBP_QUALITY),
+}
+
+# ----------------------------
+# EVIDENCE STORE
+# ----------------------------
+class EvidenceStore:
+    # Keeps evidence images for toll decisions under
+    #   root/YYYY/MM/DD/HHMMSS-mmm-seq_<lane>_<plate>_<kind>_frame.<ext>
+    # plus a matching _plate file with the plate crop.
+    #
+    # save() only queues the images and returns the evidence id straight
+    # away (the path stem, for the journal); encoding and writing happen
+    # on `workers` background threads. The queue holds at most
+    # `max_pending` jobs; when it is full `policy` drops either the oldest
+    # queued job or the new one, so a slow disk never blocks a lane.
+    #
+    # An id can be handed out and journaled before its job is dropped
+    # for a newer one or fails to write; `on_lost(evidence_id, reason)` is
+    # then called (from whichever thread noticed) so the loss can be
+    # journaled too. TollGateEngine hands it to its sinks.
+    #
+    # With `quota_bytes` the oldest files are deleted once the store
+    # grows past it. File names sort by time within the date shards, so
+    # the startup scan gives the eviction order for free.
+
+    def __init__(self, root, fmt="jpg", quality=85, workers=2, max_pending=16,
+                 policy="drop_oldest", quota_bytes=None, on_lost=None):
+        if fmt not in ENCODINGS:
+            raise ValueError(f"unknown evidence format {fmt!r}")
+        if policy not in DROP_POLICIES:
+            raise ValueError(f"unknown drop policy {policy!r}")
+        self.root = root
+        self.ext, quality_flag = ENCODINGS[fmt]
+        self.params = [quality_flag, quality]
+        self.policy = policy
+        self.quota_bytes = quota_bytes
+        self.on_lost = on_lost
+
+        self.jobs = queue.Queue(maxsize=max_pending)
+        self.lock = threading.Lock()
+        self.files = deque()
+        self.bytes = 0
+        self.saved = 0
+        self.dropped = 0
+        self.evicted = 0
+        self.errors = 0
+        self.sequence = itertools.count()
+
+        os.makedirs(root, exist_ok=True)
+        self._scan()
+        self._threads = [threading.Thread(target=self._worker, daemon=True)
+                         for _ in range(workers)]
+        for t in self._threads:
+            t.start()
+
+    def _scan(self):
+        found = []
+        for dirpath, _, names in os.walk(self.root):
+            for name in names:
+                if name.endswith((".jpg", ".webp")):
+                    path = os.path.join(dirpath, name)
+                    found.append((os.path.relpath(path, self.root), path,
+                                  os.path.getsize(path)))
+        found.sort()
+        for _, path, size in found:
+            self.files.append((path, size))
+            self.bytes += size
+
+    # ---------------- SAVING ----------------
+    def save(self, frame, crop=None, plate="-", kind="evidence", lane="MAIN"):
+        # The images must not be modified after this call; pass copies
+        # if the caller keeps drawing on them
+        now = time.time()
+        stamp = time.strftime("%Y/%m/%d/%H%M%S", time.localtime(now))
+        safe = re.sub(r"[^A-Za-z0-9]+", "-", f"{lane}_{plate}_{kind}")
+        evidence_id = (f"{stamp}-{int(now * 1000) % 1000:03d}"
+                       f"-{next(self.sequence) % 10000:04d}_{safe}")
+
+        job = (evidence_id, frame, crop)
+        while True:
+            try:
+                self.jobs.put_nowait(job)
+                return evidence_id
+            except queue.Full:
+                if self.policy == "drop_newest":
+                    self.dropped += 1
+                    return None
+                try:
+                    dropped = self.jobs.get_nowait()
+                except queue.Empty:
+                    continue
+                self.dropped += 1
+                if dropped is not None:
+                    self._lost(dropped[0], "dropped")
+
+    def _worker(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                return
+            evidence_id, frame, crop = job
+            try:
+                self._write(evidence_id + "_frame", frame)
+                if crop is not None and crop.size:
+                    self._write(evidence_id + "_plate", crop)
+            except (OSError, cv2.error):
+                self.errors += 1
+                self._lost(evidence_id, "write failed")
+                continue
+            self.saved += 1
+            self._evict()
+
+    def _lost(self, evidence_id, reason):
+        if self.on_lost:
+            self.on_lost(evidence_id, reason)
+
+    def _write(self, name, image):
+        ok, data = cv2.imencode(self.ext, image, self.params)
+        if not ok:
+            raise OSError(f"could not encode {name}")
+        path = os.path.join(self.root, name + self.ext)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        with self.lock:
+            self.files.append((path, len(data)))
+            self.bytes += len(data)
+
+    def _evict(self):
+        if not self.quota_bytes:
+            return
+        while True:
+            with self.lock:
+                if self.bytes <= self.quota_bytes or not self.files:
+                    return
+                path, size = self.files.popleft()
+                self.bytes -= size
+            try:
+                os.remove(path)
+                self.evicted += 1
+            except OSError:
+                continue
+            self._prune(os.path.dirname(path))
+
+    def _prune(self, directory):
+        # Drop day/month/year directories once their last file is gone
+        root = os.path.abspath(self.root)
+        directory = os.path.abspath(directory)
+        while directory != root and directory.startswith(root):
+            try:
+                os.rmdir(directory)
+            except OSError:
+                return
+            directory = os.path.dirname(directory)
+
+    def close(self):
+        # Writes whatever is still queued, then stops the workers
+        for _ in self._threads:
+            self.jobs.put(None)
+        for t in self._threads:
+            t.join(timeout=5.0)
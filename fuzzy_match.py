@@ -0,0 +1,136 @@
+import math
+from collections import namedtuple
+
+import numpy as np
+
+from records import ALPHABET, PLATE_WIDTH, decode_plate, encode_plate
+
+# ----------------------------
+# OCR CONFUSIONS
+# ----------------------------
+# Character pairs Tesseract mixes up on plates (both directions)
+CONFUSABLE = [
+    ("O", "0"), ("D", "0"), ("Q", "0"), ("I", "1"), ("L", "1"),
+    ("B", "8"), ("S", "5"), ("Z", "2"), ("G", "6"), ("A", "4"), ("T", "7"),
+]
+
+CONFUSION_COST = 0.3
+SUBSTITUTION_COST = 1.0
+INDEL_COST = 1.0
+
+# Confidence is a softmax over exp(-SHARPNESS * cost) of every registry
+# plate within reach, plus a "the read is right and the plate is simply
+# unknown" hypothesis at NO_MATCH_COST
+NO_MATCH_COST = 1.2
+SHARPNESS = 3.0
+
+# Layout of is_valid_plate(): L = letter, D = digit
+LAYOUT = "LLDDLLDDDD"
+TO_LETTER = {d: l for l, d in CONFUSABLE if d.isdigit() and l not in "DQL"}
+TO_DIGIT = {l: d for l, d in CONFUSABLE}
+
+def normalize_plate(text):
+    # A 10-character read can only be a letter or a digit in each slot,
+    # so swap confusable characters into the right class
+    if len(text) != len(LAYOUT):
+        return text
+    return "".join(
+        TO_LETTER.get(c, c) if kind == "L" else TO_DIGIT.get(c, c)
+        for c, kind in zip(text, LAYOUT)
+    )
+
+# ----------------------------
+# CANDIDATE GENERATION
+# ----------------------------
+_WEIGHTS = np.array([37 ** (PLATE_WIDTH - 1 - i) for i in range(PLATE_WIDTH)],
+                    dtype=np.int64)
+_CODES = np.arange(1, 37, dtype=np.int64)
+
+# normalize_plate() turns a letter misread as a digit back into a letter,
+# but not always the right one (a D read as 0 comes back as O), so letters
+# that share a confusable digit are confusable with each other too
+_SAME_CLASS = [(a, b) for a, d in CONFUSABLE for b, e in CONFUSABLE
+               if d == e and a < b]
+
+_SUB_COST = np.full((37, 37), SUBSTITUTION_COST)
+for _a, _b in CONFUSABLE + _SAME_CLASS:
+    _SUB_COST[ALPHABET.index(_a) + 1, ALPHABET.index(_b) + 1] = CONFUSION_COST
+    _SUB_COST[ALPHABET.index(_b) + 1, ALPHABET.index(_a) + 1] = CONFUSION_COST
+
+def edit_candidates(plate):
+    # Keys and costs of every plate one substitution, deletion or
+    # insertion away, computed directly on the base-37 encoding
+    # (records.encode_plate) without building any strings
+    codes = np.array([ALPHABET.index(c) + 1 for c in plate], dtype=np.int64)
+    n = len(codes)
+    terms = codes * _WEIGHTS[:n]
+    key = int(terms.sum())
+    prefix = np.concatenate(([0], np.cumsum(terms)))  # sum of chars < i
+
+    keys, costs = [], []
+
+    # Substitute position i with any other character
+    sub = key + (_CODES[None, :] - codes[:, None]) * _WEIGHTS[:n, None]
+    other = _CODES[None, :] != codes[:, None]
+    keys.append(sub[other])
+    costs.append(_SUB_COST[codes[:, None], _CODES[None, :]][other])
+
+    # Delete position i: everything after it moves up one place
+    keys.append(prefix[:-1] + (key - prefix[1:]) * 37)
+    costs.append(np.full(n, INDEL_COST))
+
+    # Insert any character before position i (or at the end)
+    if n < PLATE_WIDTH:
+        base = prefix + (key - prefix) // 37
+        ins = base[:, None] + _CODES[None, :] * _WEIGHTS[:n + 1, None]
+        keys.append(ins.ravel())
+        costs.append(np.full(ins.size, INDEL_COST))
+
+    keys = np.concatenate(keys)
+    costs = np.concatenate(costs)
+
+    # Different edits can give the same plate; keep the cheapest
+    order = np.lexsort((costs, keys))
+    keys, costs = keys[order], costs[order]
+    first = np.ones(len(keys), dtype=bool)
+    first[1:] = keys[1:] != keys[:-1]
+    first &= keys != 0
+    return keys[first], costs[first]
+
+# ----------------------------
+# FUZZY MATCHER
+# ----------------------------
+FuzzyMatch = namedtuple("FuzzyMatch", "plate cost confidence candidates")
+
+class FuzzyPlateMatcher:
+    # Finds the registry or offense-list plate closest to an OCR read,
+    # allowing one edit. The few hundred edit-distance-1 neighbours of the
+    # read are generated as encoded keys and probed against the records
+    # in one vectorised call, so cost does not grow with the list size.
+
+    def __init__(self, records, max_cost=INDEL_COST):
+        self.records = records
+        self.max_cost = max_cost
+
+    def match(self, plate):
+        key = encode_plate(plate)
+        if not key:
+            return None
+        if self.records.known_many(np.array([key]))[0]:
+            return FuzzyMatch(plate, 0.0, 1.0, 1)
+
+        keys, costs = edit_candidates(plate)
+        keep = costs <= self.max_cost
+        keys, costs = keys[keep], costs[keep]
+
+        found = self.records.known_many(keys)
+        if not found.any():
+            return None
+        keys, costs = keys[found], costs[found]
+
+        weights = np.exp(-SHARPNESS * costs)
+        best = int(np.argmin(costs))
+        confidence = weights[best] / (weights.sum()
+                                      + math.exp(-SHARPNESS * NO_MATCH_COST))
+        return FuzzyMatch(decode_plate(keys[best]), float(costs[best]),
+                          float(confidence), len(keys))
@@ -0,0 +1,214 @@
+import argparse
+import queue
+import signal
+import socketserver
+import sys
+import threading
+import time
+
+from metrics import Metrics, serve_metrics
+from multilane import add_plaza_args, build_plaza, close_plaza
+
+# ----------------------------
+# COMMANDS
+# ----------------------------
+HELP = ("commands: process [lane] | manual [lane] | rescan [lane] | "
+        "camera <lane> <source> | status | quit")
+
+class CommandQueue:
+    # Operator commands arrive on reader threads (stdin, socket clients)
+    # but lanes are only touched from the main loop. Each command carries
+    # a one-slot queue its reply is put on.
+
+    def __init__(self):
+        self.commands = queue.Queue()
+
+    def send(self, line, timeout=5.0):
+        reply = queue.Queue(maxsize=1)
+        self.commands.put((line, reply))
+        try:
+            return reply.get(timeout=timeout)
+        except queue.Empty:
+            return "ERR timed out"
+
+    def pending(self):
+        while True:
+            try:
+                yield self.commands.get_nowait()
+            except queue.Empty:
+                return
+
+def read_stdin(commands):
+    # End of input (stdin from /dev/null under a service manager) only
+    # stops reading commands here; the lanes keep running until "quit"
+    for line in sys.stdin:
+        if line.strip():
+            print(commands.send(line), flush=True)
+
+class CommandHandler(socketserver.StreamRequestHandler):
+    # One command per line, one reply line back
+    def handle(self):
+        for raw in self.rfile:
+            line = raw.decode(errors="replace").strip()
+            if line:
+                reply = self.server.commands.send(line)
+                self.wfile.write((reply + "\n").encode())
+
+class CommandServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, port, commands):
+        super().__init__(("127.0.0.1", port), CommandHandler)
+        self.commands = commands
+
+# ----------------------------
+# HEADLESS PLAZA
+# ----------------------------
+def lane_status(lane):
+    d = lane.dashboard
+    age = lane.source.age()
+    return (f"{lane.name} plate={d['plate']} gate={d['gate']} "
+            f"status={d['status']!r} cash={lane.total_cash} "
+            f"approved={lane.stats['approved']} "
+            f"rejected={lane.stats['rejected']} "
+            f"manual={lane.stats['manual_approved']} "
+            f"online={lane.online} "
+            f"frame_age_ms={'-' if age is None else f'{age * 1000:.0f}'} "
+            f"dropped={lane.source.dropped}")
+
+def run_command(line, engine):
+    # Returns (reply, quit)
+    lanes = engine.lanes
+    words = line.split()
+    name = words[0].lower()
+
+    if name == "quit":
+        return "OK bye", True
+    if name == "status":
+        return " ; ".join(lane_status(lane) for lane in lanes), False
+
+    index = 1
+    if len(words) > 1:
+        if not words[1].isdigit() or not 1 <= int(words[1]) <= len(lanes):
+            return f"ERR no lane {words[1]}", False
+        index = int(words[1])
+    lane = lanes[index - 1]
+
+    if name in ("process", "enter"):
+        done = lane.process()
+        return ("OK analysing" if done else "ERR no pending plate"), False
+    if name == "manual":
+        done = lane.manual_approve()
+        return ("OK manual approved" if done
+                else "ERR nothing to approve"), False
+    if name == "rescan":
+        lane.rescan()
+        return "OK rescanning", False
+    if name == "camera":
+        if len(words) != 3:
+            return "ERR usage: camera <lane> <source>", False
+        # A source used before is still open in the pool; a new one opens
+        # in the background and the lane moves once it has frames
+        engine.switch_camera(lane, words[2], done=camera_switched)
+        return f"OK {lane.name} switching to {words[2]}", False
+    return f"ERR unknown command, {HELP}", False
+
+def log(text):
+    print(f"{time.strftime('%H:%M:%S')} {text}", flush=True)
+
+def camera_switched(lane, name, ok):
+    if ok:
+        log(f"{lane.name} CAMERA {name}")
+    else:
+        log(f"{lane.name} CAMERA {name} has no signal, staying on the "
+            f"current one")
+
+class EventLog:
+    # Engine sink printing plates and verdicts as they happen
+    def record(self, event):
+        if event["type"] == "plate":
+            log(f"{event['lane']} PLATE {event['plate']}")
+        elif event["type"] == "evidence_lost":
+            log(f"EVIDENCE {event['evidence']} {event['reason']}")
+        elif event["manual"]:
+            log(f"{event['lane']} MANUAL APPROVED {event['plate']}")
+        else:
+            log(f"{event['lane']} VERDICT {event['plate']} {event['status']} "
+                f"({event['lookup_ms']:.2f} ms)")
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run toll lanes without a display; operator commands "
+                    "come from stdin or a local socket")
+    add_plaza_args(parser)
+    parser.add_argument("--port", type=int,
+                        help="also accept commands on 127.0.0.1:PORT")
+    parser.add_argument("--no-stdin", action="store_true",
+                        help="do not read commands from stdin")
+    parser.add_argument("--auto", action="store_true",
+                        help="process every plate without waiting for an "
+                             "operator (unattended lanes, video tests)")
+    parser.add_argument("--sound", action="store_true")
+    parser.add_argument("--tick", type=float, default=0.005,
+                        help="main loop sleep in seconds")
+    args = parser.parse_args()
+
+    metrics = Metrics(enabled=bool(args.metrics_port))
+    records, engine = build_plaza(args, sound=args.sound, metrics=metrics,
+                                  auto_process=args.auto)
+    engine.sinks.append(EventLog())
+    lanes = engine.lanes
+    metrics_server = server = None
+
+    # Ctrl-C and a service stop (SIGTERM) end the loop like "quit" does, and
+    # whatever ends it the engine is closed on the way out, so the journal
+    # and queued evidence writes are flushed
+    stop = threading.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda signum, frame: stop.set())
+    try:
+        if args.metrics_port:
+            metrics_server = serve_metrics(metrics, args.metrics_port)
+
+        commands = CommandQueue()
+        if not args.no_stdin:
+            threading.Thread(target=read_stdin, args=(commands,),
+                             daemon=True).start()
+        if args.port:
+            server = CommandServer(args.port, commands)
+            threading.Thread(target=server.serve_forever,
+                             daemon=True).start()
+        log(f"{len(lanes)} lane(s) running headless; {HELP}")
+
+        ocr_failed = False
+        while not stop.is_set():
+            engine.step()
+
+            # Only the first one; toll_ocr_errors_total counts them all
+            if engine.ocr_pool.errors and not ocr_failed:
+                log(f"OCR failed: {engine.ocr_pool.error}")
+                ocr_failed = True
+
+            for line, reply in commands.pending():
+                text, quit_now = run_command(line, engine)
+                reply.put(text)
+                if quit_now:
+                    stop.set()
+
+            # Video files and image directories end; cameras and streams
+            # keep reconnecting
+            if all(lane.source.ended for lane in lanes):
+                log("All sources ended")
+                break
+
+            time.sleep(args.tick)
+    finally:
+        if server:
+            server.shutdown()
+        if metrics_server:
+            metrics_server.shutdown()
+        close_plaza(records, engine)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+import json
+import os
+import queue
+import threading
+import time
+
+FSYNC_POLICIES = ("always", "interval", "never")
+
+EMPTY_STATS = {"total": 0, "approved": 0, "rejected": 0, "manual_approved": 0}
+
+# ----------------------------
+# EVENTS
+# ----------------------------
+def plate_event(lane, plate, agreement):
+    # A plate the voter settled on, before anyone has paid for it
+    return {
+        "type": "plate", "ts": time.time(), "lane": lane, "plate": plate,
+        "agreement": round(agreement, 3),
+    }
+
+def verdict_event(lane, plate, verdict, amount, lookup_ms=None,
+                  evidence=None):
+    # `verdict` is a records.Verdict; `plate` is what OCR read and
+    # "matched" the plate a fuzzy match checked instead
+    approved = verdict.approved
+    return {
+        "type": "verdict", "ts": time.time(), "lane": lane, "plate": plate,
+        "matched": verdict.matched,
+        "verdict": "APPROVED" if approved else "REJECTED",
+        "offenses": verdict.offenses, "mask": verdict.mask,
+        "amount": amount if approved else 0, "manual": False,
+        "status": verdict.text, "lookup_ms": lookup_ms, "evidence": evidence,
+    }
+
+def manual_event(lane, plate, amount, evidence=None):
+    return {
+        "type": "verdict", "ts": time.time(), "lane": lane, "plate": plate,
+        "verdict": "APPROVED", "offenses": [], "mask": 0, "amount": amount,
+        "manual": True, "status": "MANUAL APPROVED", "evidence": evidence,
+    }
+
+def evidence_lost_event(evidence_id, reason):
+    # An evidence id an earlier event refers to whose images were never
+    # written (dropped under load or a failed write)
+    return {
+        "type": "evidence_lost", "ts": time.time(), "evidence": evidence_id,
+        "reason": reason,
+    }
+
+# ----------------------------
+# REPLAY
+# ----------------------------
+def read_journal(path):
+    # Events in file order. A crash can leave the last line half written;
+    # anything that does not parse as a JSON object is skipped.
+    if not os.path.exists(path):
+        return
+    with open(path, "rb") as f:
+        for line in f:
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(event, dict):
+                yield event
+
+def lane_totals(events):
+    # {lane: (stats, total_cash)} from the last snapshot and every
+    # verdict after it
+    totals = {}
+    for event in events:
+        if not isinstance(event, dict):
+            continue
+        if event.get("type") == "snapshot":
+            totals = {lane: (dict(t["stats"]), t["total_cash"])
+                      for lane, t in event["lanes"].items()}
+            continue
+        if event.get("type") != "verdict":
+            continue
+        stats, cash = totals.get(event["lane"], (dict(EMPTY_STATS), 0))
+        if event["manual"]:
+            stats["manual_approved"] += 1
+        else:
+            stats["total"] += 1
+            stats["approved" if event["verdict"] == "APPROVED"
+                  else "rejected"] += 1
+        totals[event["lane"]] = (stats, cash + event["amount"])
+    return totals
+
+def snapshot_event(totals):
+    return {
+        "type": "snapshot", "ts": time.time(),
+        "lanes": {lane: {"stats": stats, "total_cash": cash}
+                  for lane, (stats, cash) in totals.items()},
+    }
+
+# ----------------------------
+# ROTATION AND COMPACTION
+# ----------------------------
+def _replace(path, events):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        for event in events:
+            f.write(json.dumps(event, separators=(",", ":")).encode() + b"\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+def rotate_journal(path, archive_dir=None):
+    # Moves the journal to a timestamped segment and starts a new one
+    # holding a snapshot of its counters, so replaying the new file alone
+    # still restores the totals. Returns the segment path.
+    totals = lane_totals(read_journal(path))
+    base, ext = os.path.splitext(os.path.basename(path))
+    stem = os.path.join(archive_dir or os.path.dirname(path) or ".",
+                        f"{base}-{time.strftime('%Y%m%d-%H%M%S')}")
+    segment, n = stem + ext, 1
+    while os.path.exists(segment):
+        segment, n = f"{stem}-{n}{ext}", n + 1
+    if os.path.exists(path):
+        os.replace(path, segment)
+    _replace(path, [snapshot_event(totals)])
+    return segment
+
+def compact_journal(path):
+    # Folds every event into one snapshot line, dropping the history and
+    # any torn lines. Returns (events before, events after).
+    events = list(read_journal(path))
+    _replace(path, [snapshot_event(lane_totals(events))])
+    return len(events), 1
+
+# ----------------------------
+# JOURNAL WRITER
+# ----------------------------
+ROTATE = object()
+
+class TransactionJournal:
+    # Append-only JSON-lines log of every toll decision (and of the plates
+    # taken before them; replay only counts verdicts).
+    #
+    # record() only queues the event, so the frame loop never touches the
+    # disk. A writer thread takes everything queued (up to `max_batch`
+    # events) and appends it with a single write: events that arrive
+    # while a write or fsync is in progress are committed together in the
+    # next batch. fsync policy:
+    #
+    #   always    fsync every batch before taking the next one
+    #   interval  fsync at most every `fsync_interval` seconds
+    #   never     leave it to the OS (a power cut can lose recent events)
+
+    def __init__(self, path, fsync="interval", fsync_interval=1.0,
+                 max_batch=512):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"unknown fsync policy {fsync!r}")
+        self.path = path
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.max_batch = max_batch
+
+        self.events = queue.Queue()
+        self.written = 0
+        self.batches = 0
+        self.syncs = 0
+        self.error = None
+
+        self.segment = None
+        self.file = open(path, "ab")
+        self._terminate_torn_line()
+        self.last_sync = time.monotonic()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _terminate_torn_line(self):
+        # A crash mid-write leaves a partial last line; start the next
+        # event on a fresh line so only the torn one is lost
+        if self.file.tell():
+            with open(self.path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    self.file.write(b"\n")
+                    self.file.flush()
+
+    def record(self, event):
+        self.events.put(event)
+
+    def _run(self):
+        dirty = False
+        while True:
+            try:
+                event = self.events.get(
+                    timeout=self.fsync_interval if dirty else None)
+            except queue.Empty:
+                # Nothing new within the interval: sync what is pending
+                self._sync()
+                dirty = False
+                continue
+
+            batch = [event]
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self.events.get_nowait())
+                except queue.Empty:
+                    break
+
+            try:
+                dirty = self._write(batch, dirty)
+            except OSError as e:
+                self.error = e
+            if batch[-1] is None:
+                return
+
+    def _write(self, batch, dirty):
+        # Returns whether written events are still waiting for an fsync
+        closing = batch[-1] is None
+        pending = []
+        for event in batch:
+            if event is ROTATE:
+                self._append(pending)
+                pending = []
+                self._rotate()
+                dirty = False
+            elif event is not None:
+                pending.append(event)
+        if self._append(pending):
+            dirty = dirty or self.fsync != "never"
+
+        due = time.monotonic() - self.last_sync >= self.fsync_interval
+        if dirty and (closing or self.fsync == "always" or due):
+            self._sync()
+            dirty = False
+        return dirty
+
+    def _append(self, events):
+        if not events:
+            return False
+        self.file.write(b"".join(
+            json.dumps(e, separators=(",", ":")).encode() + b"\n"
+            for e in events))
+        self.file.flush()
+        self.written += len(events)
+        self.batches += 1
+        return True
+
+    def _sync(self):
+        os.fsync(self.file.fileno())
+        self.syncs += 1
+        self.last_sync = time.monotonic()
+
+    def _rotate(self):
+        self._sync()
+        self.file.close()
+        self.segment = rotate_journal(self.path)
+        self.file = open(self.path, "ab")
+
+    def rotate(self):
+        # Start a new journal file (e.g. at a shift change); runs on the
+        # writer thread after every event recorded before it
+        self.events.put(ROTATE)
+
+    def close(self):
+        self.events.put(None)
+        self._thread.join(timeout=5.0)
+        self.file.close()
@@ -0,0 +1,56 @@
+import argparse
+import sys
+
+from journal import compact_journal, lane_totals, read_journal, rotate_journal
+
+# ----------------------------
+# COMMANDS
+# ----------------------------
+def summary(path):
+    events = list(read_journal(path))
+    verdicts = sum(1 for e in events if e.get("type") == "verdict")
+    print(f"{path}: {len(events)} records, {verdicts} verdicts")
+    for lane, (stats, cash) in sorted(lane_totals(events).items()):
+        print(f"  {lane}: total {stats['total']}  approved "
+              f"{stats['approved']}  rejected {stats['rejected']}  manual "
+              f"{stats['manual_approved']}  cash INR {cash}")
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Inspect, rotate or compact a toll transaction journal")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("summary", help="print the counters it restores")
+    p.add_argument("journal")
+
+    p = sub.add_parser("rotate",
+                       help="move the journal to a dated segment and start "
+                            "a new one from a snapshot of its counters")
+    p.add_argument("journal")
+    p.add_argument("--archive-dir",
+                   help="where to put the segment (default: next to it)")
+
+    p = sub.add_parser("compact",
+                       help="fold every event into one snapshot, "
+                            "discarding the history (rotate keeps it)")
+    p.add_argument("journal")
+
+    args = parser.parse_args()
+
+    # Rotate and compact rewrite the file: run them while the toll
+    # application is stopped, or use TransactionJournal.rotate() from
+    # inside it
+    if args.command == "summary":
+        summary(args.journal)
+    elif args.command == "rotate":
+        segment = rotate_journal(args.journal, args.archive_dir)
+        print(f"archived to {segment}")
+        summary(args.journal)
+    elif args.command == "compact":
+        before, after = compact_journal(args.journal)
+        print(f"compacted {before} records into {after}")
+        summary(args.journal)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
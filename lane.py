@@ -0,0 +1,278 @@
+import time
+
+from fuzzy_match import normalize_plate
+from journal import manual_event, plate_event, verdict_event
+from metrics import null_timer
+from motion_gate import MotionGate
+from plate_voting import PlateVoter
+from records import MANUAL_APPROVED, VerdictStatus
+from sound import play_sound
+
+TOLL_AMOUNT = 50
+
+IDLE_DASHBOARD = {
+    "plate": "-",
+    "status": "Waiting for vehicle",
+    "gate": "CLOSED",
+    "payment": "-",
+    "cash": "NO"
+}
+
+# ----------------------------
+# LANE
+# ----------------------------
+class Lane:
+    # Everything one toll lane used to keep in script globals: its camera
+    # source (a camera_pool.CameraSource, or anything with the same
+    # read()), dashboard, pending plate, frozen frame and reset timer. Lanes share
+    # an OCRWorkerPool; results come back tagged with the lane name and are
+    # handed to on_ocr(). Verdicts run on a shared VerdictPipeline and are
+    # applied by step() once they are back. Every plate taken, verdict and
+    # manual approval is handed as an event to each of `sinks` (see
+    # journal.py), and with an `evidence` store rejections and manual
+    # approvals keep their images. With `auto_process` a plate goes to the
+    # verdict pipeline as soon as it is taken, without an operator.
+    #
+    # TollGateEngine builds lanes and drives them.
+
+    __slots__ = (
+        "name", "source", "ocr_pool", "verdicts", "roi",
+        "reset_delay_approved", "reset_delay_rejected", "sound", "timer",
+        "detect", "sinks", "evidence", "auto_process",
+        "motion_gate", "voter",
+        "stats", "total_cash", "dashboard",
+        "last_processed_plate", "last_manual_plate", "pending_plate",
+        "processing_in_progress", "verdict", "frozen_frame", "frozen_box",
+        "reset_at", "last_submitted_seq", "verdict_job", "last_lookup_ms",
+        "frame", "online",
+    )
+
+    def __init__(self, name, source, ocr_pool, verdicts, validate,
+                 roi=(0.25, 0.45, 0.75, 0.65),
+                 reset_delay_approved=5, reset_delay_rejected=30,
+                 sound=True, timer=null_timer, detect=False,
+                 sinks=(), evidence=None, auto_process=False):
+        self.name = name
+        self.source = source
+        self.ocr_pool = ocr_pool
+        self.verdicts = verdicts
+        self.roi = roi
+        self.reset_delay_approved = reset_delay_approved
+        self.reset_delay_rejected = reset_delay_rejected
+        self.sound = sound
+        self.timer = timer
+        self.detect = detect
+        self.sinks = sinks
+        self.evidence = evidence
+        self.auto_process = auto_process
+
+        self.motion_gate = MotionGate()
+        self.voter = PlateVoter(validate=validate, normalize=normalize_plate)
+
+        self.stats = {"total": 0, "approved": 0, "rejected": 0,
+                      "manual_approved": 0}
+        self.total_cash = 0
+        self.dashboard = dict(IDLE_DASHBOARD)
+
+        self.last_processed_plate = None
+        self.last_manual_plate = None
+        self.pending_plate = None
+        self.processing_in_progress = False
+        self.verdict = None
+        self.frozen_frame = None
+        self.frozen_box = None
+        self.reset_at = None
+        self.last_submitted_seq = 0
+        self.verdict_job = None
+        self.last_lookup_ms = None
+
+        self.frame = None
+        self.online = True
+
+    def box(self, w, h):
+        fx1, fy1, fx2, fy2 = self.roi
+        return int(w*fx1), int(h*fy1), int(w*fx2), int(h*fy2)
+
+    @property
+    def approved(self):
+        # Whether the lane is showing an approval (dashboards colour by it)
+        return self.verdict is not None and self.verdict.approved
+
+    def _play(self, sound):
+        if self.sound:
+            play_sound(sound)
+
+    def _emit(self, event):
+        for sink in self.sinks:
+            sink.record(event)
+
+    # ---------------- FRAME STEP ----------------
+    def step(self):
+        if self.reset_at and time.time() >= self.reset_at:
+            self.dashboard.update(IDLE_DASHBOARD)
+            self.verdict = None
+            self.last_processed_plate = None
+            self.last_manual_plate = None
+            self.reset_at = None
+
+        if self.verdict_job:
+            if self.verdict_job.done():
+                self._apply_verdict(*self.verdict_job.result())
+            else:
+                self.dashboard["status"] = self.verdict_job.progress_text()
+
+        if self.processing_in_progress:
+            self.frame = self.frozen_frame
+            return self.frame
+
+        with self.timer("capture"):
+            ret, frame, seq = self.source.read()
+        if not ret:
+            # The source reconnects on its own; keep the last frame
+            self.online = False
+            return self.frame
+        self.online = True
+        self.frame = frame
+
+        if seq != self.last_submitted_seq:
+            h, w = frame.shape[:2]
+            if self.detect:
+                # The shared pool's detector finds the plate
+                watched, box = frame, None
+            else:
+                x1, y1, x2, y2 = box = self.box(w, h)
+                watched = frame[y1:y2, x1:x2]
+            with self.timer("motion_gate"):
+                moving = self.motion_gate.check(watched)
+            if moving:
+                self.ocr_pool.submit(frame, box, tag=self.name)
+            self.last_submitted_seq = seq
+
+        return frame
+
+    def on_ocr(self, plate, confidence, frame, box=None):
+        # `box` is where in the frame the plate was read
+        if self.processing_in_progress:
+            return
+
+        consensus = self.voter.add(plate, confidence, (frame, box))
+        if not consensus or consensus.plate == self.last_processed_plate:
+            return
+
+        self.pending_plate = consensus.plate
+        self.verdict = None
+        frame, self.frozen_box = consensus.payload
+        self.frozen_frame = frame.copy()
+        self.processing_in_progress = True
+        self.ocr_pool.flush(self.name)
+
+        self.dashboard["plate"] = consensus.plate
+        self.dashboard["status"] = "Awaiting payment confirmation"
+        self.dashboard["payment"] = f"INR {TOLL_AMOUNT} pending"
+        self.dashboard["gate"] = "CLOSED"
+        self.dashboard["cash"] = "NO"
+        self._emit(plate_event(self.name, consensus.plate,
+                               consensus.agreement))
+        if self.auto_process:
+            self.process()
+
+    def _save_evidence(self, plate, kind):
+        frame = self.frozen_frame
+        if not self.evidence or frame is None:
+            return None
+        # The box OCR read the plate from (the detector's, or the ROI)
+        box = self.frozen_box
+        if box is None and not self.detect:
+            h, w = frame.shape[:2]
+            box = self.box(w, h)
+        crop = None
+        if box is not None:
+            x1, y1, x2, y2 = box
+            crop = frame[y1:y2, x1:x2]
+        return self.evidence.save(frame, crop, plate, kind, self.name)
+
+    # ---------------- OPERATOR ACTIONS ----------------
+    def process(self):
+        if not self.pending_plate or self.verdict_job:
+            return False
+
+        self.dashboard["status"] = "ANALYSING VEHICLE RECORDS ..."
+        self.verdict_job = self.verdicts.submit(self.pending_plate)
+        return True
+
+    def _apply_verdict(self, verdict, lookup_seconds):
+        self.verdict_job = None
+        self.last_lookup_ms = lookup_seconds * 1000
+        evidence_id = None
+        if not verdict.approved:
+            evidence_id = self._save_evidence(self.pending_plate, "rejected")
+        self._emit(verdict_event(self.name, self.pending_plate, verdict,
+                                 TOLL_AMOUNT, self.last_lookup_ms,
+                                 evidence_id))
+
+        self.stats["total"] += 1
+        self.dashboard["status"] = verdict.text
+        self.verdict = verdict
+
+        if verdict.approved:
+            self.dashboard["payment"] = f"INR {TOLL_AMOUNT} credited"
+            self.dashboard["gate"] = "OPEN"
+            self.dashboard["cash"] = "YES"
+            self.stats["approved"] += 1
+            self.total_cash += TOLL_AMOUNT
+            self._play("approved")
+            self.reset_at = time.time() + self.reset_delay_approved
+        else:
+            self.dashboard["payment"] = "Payment failed"
+            self.dashboard["gate"] = "CLOSED"
+            self.stats["rejected"] += 1
+            self._play("rejected")
+            self.reset_at = time.time() + self.reset_delay_rejected
+
+        self.last_processed_plate = self.pending_plate
+        self.pending_plate = None
+        self.processing_in_progress = False
+
+    def manual_approve(self):
+        if (self.dashboard["gate"] != "CLOSED" or self.verdict is None
+                or self.verdict.status is not VerdictStatus.REJECTED
+                or self.last_manual_plate == self.dashboard["plate"]):
+            return False
+
+        self.verdict = MANUAL_APPROVED
+        self.dashboard["status"] = MANUAL_APPROVED.text
+        self.dashboard["payment"] = f"INR {TOLL_AMOUNT} credited (Manual)"
+        self.dashboard["gate"] = "OPEN"
+        self.dashboard["cash"] = "YES"
+        self.stats["manual_approved"] += 1
+        self.total_cash += TOLL_AMOUNT
+        self._play("approved")
+        evidence_id = self._save_evidence(self.dashboard["plate"], "manual")
+        self._emit(manual_event(self.name, self.dashboard["plate"],
+                                TOLL_AMOUNT, evidence_id))
+
+        self.last_manual_plate = self.dashboard["plate"]
+        self.reset_at = time.time() + self.reset_delay_approved
+        return True
+
+    def rescan(self):
+        self.dashboard.update(IDLE_DASHBOARD)
+        self.verdict = None
+        self.last_processed_plate = None
+        self.last_manual_plate = None
+        self.pending_plate = None
+        self.processing_in_progress = False
+        self.reset_at = None
+        if self.verdict_job:
+            self.verdict_job.cancel()
+            self.verdict_job = None
+        self.ocr_pool.flush(self.name)
+        self.motion_gate.reset()
+        self.voter.reset()
+
+    def switch_source(self, source):
+        # The old source keeps running (a CameraPool keeps it warm)
+        self.source = source
+        self.frame = None
+        self.last_submitted_seq = 0
+        self.rescan()
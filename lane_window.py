@@ -0,0 +1,273 @@
+import sys
+
+import cv2
+import numpy as np
+
+from dashboard_render import (DashboardRenderer, MetricsOverlay, clip_lines,
+                              wrap_text)
+from engine import build_engine
+from lane import TOLL_AMOUNT
+from metrics import Metrics, serve_metrics
+
+WINDOW = "Smart Toll Gate"
+DASHBOARD_WIDTH = 760
+
+# Camera area shown until the camera delivers its first frame
+NO_SIGNAL_SHAPE = (480, 640, 3)
+
+# The status gets a single line, ending in "+N more" when it is longer,
+# so the rows below it never move, the renderer only repaints what
+# changed and the diagnostics still fit under the counters on a 480-line
+# camera
+STATUS_LINES = 1
+# Diagnostics and key help are drawn smaller; the help sits at the bottom
+# of the panel, in the renderer's static layer, and the diagnostics get
+# the lines left above it (the rest show as "+N more")
+SMALL_SCALE = 0.5
+HELP_MARGIN = 12
+
+# ----------------------------
+# LANE WINDOW
+# ----------------------------
+class LaneWindow:
+    # The single-lane operator window v1.py and v5.py show: the camera
+    # with the payment banner, plate box and gate status over it, and the
+    # dashboard panel beside it. The lane itself runs on `engine`; this
+    # only draws it and turns keys into lane actions:
+    #
+    #   ENTER  process the pending plate     M      manual approval
+    #   R      re-scan (with `rescan`)       1/2/3  switch camera
+    #   Q      quit
+    #
+    # `cameras` are the camera indices for keys 1, 2, 3, ...; each is
+    # opened in the background the first time it is picked and kept open
+    # afterwards, so switching back is instant.
+
+    def __init__(self, engine, lane, records, metrics, show_metrics=False,
+                 rescan=True, cameras=()):
+        self.engine = engine
+        self.lane = lane
+        self.records = records
+        self.metrics = metrics
+        self.rescan = rescan
+        self.cameras = {ord(str(i + 1)): name
+                        for i, name in enumerate(cameras)}
+        self.no_signal = np.zeros(NO_SIGNAL_SHAPE, dtype=np.uint8)
+
+        if rescan:
+            self.help = ["ENTER=Process | M=Manual | R=Re-Scan | "
+                         "1/2/3=Camera | Q=Quit"]
+        else:
+            self.help = ["ENTER=Process | M=Manual | 1/2/3=Camera | Q=Quit"]
+
+        self.renderer = DashboardRenderer(DASHBOARD_WIDTH,
+                                          static_rows=self.static_rows)
+        self.overlay = MetricsOverlay(metrics) if show_metrics else None
+
+    def help_row(self, height):
+        # The key help as one small row ending just above the panel bottom
+        y = (height - HELP_MARGIN
+             - (len(self.help) - 1) * self.renderer.line_step(SMALL_SCALE))
+        return (y, tuple(self.help), (180,180,180), SMALL_SCALE)
+
+    def static_rows(self, height):
+        return [(45, "SMART TOLL GATE", (0,255,255)), self.help_row(height)]
+
+    # ---------------- DASHBOARD ----------------
+    def draw_dashboard(self):
+        lane = self.lane
+        dashboard = lane.dashboard
+        records = self.records
+        rows = []
+        y = 77
+
+        def put(t, c=(255,255,255)):
+            nonlocal y
+            rows.append((y, t, c))
+            y += 32
+
+        put(f"Plate: {dashboard['plate']}")
+
+        status_color = (0,255,0) if lane.approved else (0,0,255)
+        status = wrap_text(f"Status: {dashboard['status']}", DASHBOARD_WIDTH - 40)
+        status = clip_lines(status, STATUS_LINES, DASHBOARD_WIDTH - 40)
+        rows.append((y, status, status_color))
+        y += (STATUS_LINES - 1) * 21 + 32
+
+        put(f"Payment: {dashboard['payment']}")
+        put(f"Cash Collected: {dashboard['cash']}")
+        put(f"Total Cash: INR {lane.total_cash}")
+        y += 10
+        put(f"Approved: {lane.stats['approved']}", (0,255,0))
+        put(f"Rejected: {lane.stats['rejected']}", (0,0,255))
+        put(f"Manual Approved: {lane.stats['manual_approved']}", (255,255,0))
+        y += 10
+
+        diagnostics = []
+        diag = diagnostics.append
+        pool = self.engine.ocr_pool
+        if pool.errors:
+            diag(f"OCR errors: {pool.errors} ({pool.error})")
+        diag(f"OCR frames: {lane.motion_gate.passed} | "
+             f"Skipped: {lane.motion_gate.skipped} | "
+             f"Vote: {lane.voter.last_decision_frames} frames")
+        diag(f"Records: v{records.version} ({len(records)} plates, "
+             f"loaded in {records.reload_seconds:.2f}s)")
+        if lane.last_lookup_ms is not None:
+            diag(f"Last lookup: {lane.last_lookup_ms:.2f} ms")
+        cache = self.engine.cache
+        if cache is not None and cache.hits + cache.misses:
+            diag(f"Verdict cache: {cache.hit_rate:.0%} hits "
+                 f"({cache.hits}/{cache.hits + cache.misses})")
+        snapshot = records.snapshot
+        if snapshot.bloom:
+            diag(f"Bloom: {snapshot.bloom_negatives} skipped | "
+                 f"{snapshot.bloom_positives} checked | "
+                 f"{snapshot.bloom_false_positives} false +")
+        age = lane.source.age()
+        if age is not None:
+            diag(f"Frame age: {age * 1000:.0f} ms | "
+                 f"Drained: {lane.source.drained} | "
+                 f"Dropped: {lane.source.dropped}")
+
+        # As many as fit between the counters and the key help
+        help_top = self.renderer.band(
+            self.help_row(self.renderer.canvas.shape[0]))[0]
+        room = self.renderer.room(y, help_top, SMALL_SCALE)
+        if room and len(diagnostics) > room:
+            hidden = len(diagnostics) - room + 1
+            diagnostics = diagnostics[:room - 1] + [f"+{hidden} more"]
+        if room:
+            rows.append((y, tuple(diagnostics), (120,120,120), SMALL_SCALE))
+
+        self.renderer.draw(rows)
+
+    # ---------------- CAMERA OVERLAYS ----------------
+    def draw_overlays(self, view):
+        # Banner, plate box and gate status over the camera area
+        lane = self.lane
+        gate = lane.dashboard["gate"]
+        h, w = view.shape[:2]
+
+        if gate == "OPEN":
+            # Payment successful banner
+            cv2.rectangle(view, (0, 0), (w, 70), (0, 0, 0), -1)
+            cv2.putText(view, f"INR {TOLL_AMOUNT} PAID SUCCESSFULLY",
+                        (int(w * 0.18), 45), cv2.FONT_HERSHEY_SIMPLEX, 0.9,
+                        (0, 255, 0), 3)
+
+        elif lane.processing_in_progress:
+            # Payment pending banner
+            cv2.rectangle(view, (0, 0), (w, 70), (0, 0, 0), -1)
+            cv2.putText(view, f"PLEASE PAY TOLL CHARGES : INR {TOLL_AMOUNT}",
+                        (int(w * 0.15), 45), cv2.FONT_HERSHEY_SIMPLEX, 0.9,
+                        (0, 255, 255), 3)
+            cv2.putText(view, 'Press "ENTER" to process',
+                        (int(w*0.28), int(h*0.55)),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0,255,255), 2)
+
+        if not lane.detect:
+            x1, y1, x2, y2 = lane.box(w, h)
+            cv2.rectangle(view, (x1,y1), (x2,y2), (0,255,0), 2)
+            cv2.putText(view, "Place Number Plate Here",
+                        (x1, y1-10), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0,255,0), 2)
+
+        if not lane.online:
+            cv2.putText(view, "NO SIGNAL - RECONNECTING",
+                        (int(w * 0.2), int(h * 0.45)),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 0, 255), 3)
+
+        # Gate status, bottom left
+        gate_color = (0, 255, 0) if gate == "OPEN" else (0, 0, 255)
+        cv2.rectangle(view, (10, h - 60), (260, h - 10), (0, 0, 0), -1)
+        cv2.putText(view, f"GATE : {gate}", (20, h - 25),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.9, gate_color, 3)
+
+    # ---------------- MAIN LOOP ----------------
+    def switch_camera(self, index):
+        # The lane stays on its camera until the new one has frames, and
+        # for good if it never does
+        if self.engine.cameras.get(index) is self.lane.source:
+            return False
+        self.engine.switch_camera(self.lane, index)
+        return True
+
+    def run(self):
+        # Until Q is pressed. A camera that drops out reconnects by itself;
+        # meanwhile its last frame stays up, marked as having no signal.
+        lane = self.lane
+        metrics = self.metrics
+        while True:
+            self.engine.step()
+            frame = lane.frame
+            if frame is None:
+                frame = self.no_signal
+
+            # The camera area is only recomposited when the frame or the
+            # overlay state changes, so a frozen frame costs nothing per
+            # tick
+            with metrics("composite"):
+                canvas = self.renderer.camera(
+                    frame, (lane.dashboard["gate"], lane.processing_in_progress,
+                            lane.online),
+                    self.draw_overlays)
+            if self.overlay:
+                self.overlay.draw(canvas, frame.shape[1] - 340, 80)
+
+            with metrics("render"):
+                self.draw_dashboard()
+            with metrics("imshow"):
+                cv2.imshow(WINDOW, canvas)
+                key = cv2.waitKey(1) & 0xFF
+
+            if key == 13:
+                lane.process()
+            elif key == ord('m'):
+                lane.manual_approve()
+            elif key == ord('r') and self.rescan:
+                lane.rescan()
+            elif key in self.cameras:
+                self.switch_camera(self.cameras[key])
+            elif key == ord('q'):
+                break
+        cv2.destroyAllWindows()
+
+# ----------------------------
+# SINGLE LANE
+# ----------------------------
+def run_lane(records, name="MAIN", roi=(0.25, 0.45, 0.75, 0.65),
+             reset_delay_approved=5, reset_delay_rejected=30, rescan=True,
+             metrics_port=None, show_metrics=False, cameras=(0, 1, 2),
+             **settings):
+    # One lane on the first of `cameras` (indices) that delivers frames,
+    # shown in a LaneWindow until it is closed; only that camera is
+    # opened until the 1/2/3 keys pick another. `settings` go to
+    # build_engine.
+    metrics = Metrics(enabled=bool(metrics_port or show_metrics))
+    engine = build_engine(records, metrics=metrics, **settings)
+    camera = None
+    for index in cameras:
+        camera = engine.cameras.add(index, index, timeout=2.0)
+        if camera.online:
+            break
+        engine.cameras.remove(index)
+        camera = None
+    if camera is None:
+        print("No camera available")
+        engine.close()
+        records.stop()
+        sys.exit(1)
+
+    lane = engine.add_lane(name, camera, roi=roi,
+                           reset_delay_approved=reset_delay_approved,
+                           reset_delay_rejected=reset_delay_rejected)
+    engine.export(metrics, records)
+    server = serve_metrics(metrics, metrics_port) if metrics_port else None
+    try:
+        LaneWindow(engine, lane, records, metrics, show_metrics,
+                   rescan, cameras).run()
+    finally:
+        if server:
+            server.shutdown()
+        engine.close()
+        records.stop()
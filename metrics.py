@@ -0,0 +1,211 @@
+import bisect
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+# ----------------------------
+# STAGE TIMING
+# ----------------------------
+_NULL = nullcontext()
+
+def null_timer(stage):
+    return _NULL
+
+class StageTimer:
+    # Wall-clock samples per pipeline stage. Call it with a stage name as
+    # a context manager around the work; pipeline functions take it as an
+    # optional `timer` and fall back to null_timer, which costs nothing.
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+
+    @contextmanager
+    def __call__(self, stage):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.samples[stage].append(time.perf_counter() - t0)
+
+    def add(self, stage, seconds):
+        self.samples[stage].append(seconds)
+
+    def percentiles(self, stage, ps=(50, 95, 99)):
+        # In milliseconds
+        return np.percentile(np.array(self.samples[stage]) * 1e3, ps)
+
+# ----------------------------
+# ROLLING HISTOGRAMS
+# ----------------------------
+# Prometheus bucket bounds in seconds, from 50 us to 2.5 s
+BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+           0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+class Histogram:
+    # Cumulative Prometheus buckets plus a ring of the last `window`
+    # samples for rolling percentiles. Stages are observed from the UI,
+    # OCR and verdict threads, hence the lock.
+
+    def __init__(self, window=1024):
+        self.lock = threading.Lock()
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.ring = np.zeros(window)
+        self.filled = 0
+
+    def observe(self, seconds):
+        with self.lock:
+            self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+            self.ring[self.count % len(self.ring)] = seconds
+            self.count += 1
+            self.sum += seconds
+            self.filled = min(self.filled + 1, len(self.ring))
+
+    def percentiles(self, ps=(50, 95, 99)):
+        # Over the rolling window, in milliseconds
+        with self.lock:
+            recent = self.ring[:self.filled].copy()
+        if not len(recent):
+            return None
+        return np.percentile(recent * 1e3, ps)
+
+class _Clock:
+    __slots__ = ("histogram", "t0")
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.t0)
+
+# ----------------------------
+# METRICS REGISTRY
+# ----------------------------
+class Metrics:
+    # Hot-path stage timers and scrape-time values for one process.
+    #
+    #   with metrics("ocr"): ...         time a block
+    #   metrics.timed("lookup", fn)      wrap a function
+    #   metrics.value(name, fn, ...)     export a counter or gauge, read
+    #                                    by calling fn at scrape time
+    #
+    # A Metrics is also a valid `timer` for read_plate(). Disabled, it
+    # hands back the shared null context and unwrapped functions, so the
+    # instrumented code runs as it did before.
+
+    def __init__(self, enabled=True, window=1024):
+        self.enabled = enabled
+        self.window = window
+        self.histograms = {}
+        self.values = []
+        self.lock = threading.Lock()
+
+    def histogram(self, stage):
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            with self.lock:
+                histogram = self.histograms.setdefault(
+                    stage, Histogram(self.window))
+        return histogram
+
+    def __call__(self, stage):
+        if not self.enabled:
+            return _NULL
+        return _Clock(self.histogram(stage))
+
+    def timed(self, stage, fn):
+        if not self.enabled:
+            return fn
+        histogram = self.histogram(stage)
+
+        def wrapper(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - t0)
+        return wrapper
+
+    def value(self, name, fn, help="", kind="gauge", labels=None):
+        self.values.append((name, fn, help, kind, labels or {}))
+
+    def percentiles(self):
+        # {stage: (p50, p95, p99)} in ms over each rolling window
+        out = {}
+        for stage, histogram in sorted(self.histograms.items()):
+            p = histogram.percentiles()
+            if p is not None:
+                out[stage] = p
+        return out
+
+    # ---------------- PROMETHEUS TEXT ----------------
+    def render(self):
+        lines = []
+        if self.histograms:
+            lines.append("# HELP toll_stage_seconds Time spent per "
+                         "pipeline stage")
+            lines.append("# TYPE toll_stage_seconds histogram")
+        for stage, h in sorted(self.histograms.items()):
+            with h.lock:
+                counts, count, total = list(h.counts), h.count, h.sum
+            cumulative = 0
+            for bound, n in zip(BUCKETS, counts):
+                cumulative += n
+                lines.append(f'toll_stage_seconds_bucket{{stage="{stage}",'
+                             f'le="{bound}"}} {cumulative}')
+            lines.append(f'toll_stage_seconds_bucket{{stage="{stage}",'
+                         f'le="+Inf"}} {count}')
+            lines.append(f'toll_stage_seconds_sum{{stage="{stage}"}} '
+                         f'{total:.6f}')
+            lines.append(f'toll_stage_seconds_count{{stage="{stage}"}} '
+                         f'{count}')
+
+        described = set()
+        for name, fn, help, kind, labels in self.values:
+            if name not in described:
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+                described.add(name)
+            label_text = ",".join(f'{k}="{v}"' for k, v in labels.items())
+            try:
+                value = float(fn())
+            except Exception:
+                continue
+            lines.append(f"{name}{{{label_text}}} {value:g}" if label_text
+                         else f"{name} {value:g}")
+        return "\n".join(lines) + "\n"
+
+# ----------------------------
+# HTTP ENDPOINT
+# ----------------------------
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = self.server.metrics.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def serve_metrics(metrics, port, host="127.0.0.1"):
+    # Prometheus text format on http://host:port/metrics, served from a
+    # daemon thread; call .shutdown() on the returned server to stop it
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    server.metrics = metrics
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,62 @@
+import time
+
+import cv2
+import numpy as np
+
+# ----------------------------
+# MOTION / CHANGE GATE
+# ----------------------------
+class MotionGate:
+    # Cheap pre-filter in front of OCR. The ROI is shrunk and compared with
+    # the previous one; OCR is only allowed while something has moved in
+    # the last `hold_seconds` and the ROI has enough edges to hold a plate.
+    # On an empty lane nothing changes, so OCR is never called.
+    #
+    #   scale         downscale factor applied to the ROI before any test
+    #   diff_level    per-pixel grey level change counted as "changed"
+    #   min_changed   fraction of changed pixels that counts as motion
+    #   min_edges     fraction of Canny edge pixels needed to bother OCR
+    #   hold_seconds  keep OCR running this long after the last motion so
+    #                 a vehicle that stops at the gate is still read
+
+    def __init__(self, scale=0.25, diff_level=25, min_changed=0.02,
+                 min_edges=0.04, hold_seconds=2.0):
+        self.scale = scale
+        self.diff_level = diff_level
+        self.min_changed = min_changed
+        self.min_edges = min_edges
+        self.hold_seconds = hold_seconds
+
+        self.prev = None
+        self.active_until = 0.0
+        self.passed = 0
+        self.skipped = 0
+
+    def check(self, roi):
+        small = cv2.resize(roi, None, fx=self.scale, fy=self.scale,
+                           interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
+        prev, self.prev = self.prev, gray
+        now = time.time()
+
+        if prev is not None and prev.shape == gray.shape:
+            diff = cv2.absdiff(gray, prev)
+            changed = np.count_nonzero(diff > self.diff_level) / diff.size
+            if changed >= self.min_changed:
+                self.active_until = now + self.hold_seconds
+
+        if now < self.active_until:
+            edges = cv2.Canny(gray, 100, 200)
+            if np.count_nonzero(edges) / edges.size >= self.min_edges:
+                self.passed += 1
+                return True
+
+        self.skipped += 1
+        return False
+
+    def reset(self):
+        # Re-arm after a re-scan or camera switch, when the vehicle may
+        # already be standing still in the ROI
+        self.prev = None
+        self.active_until = time.time() + self.hold_seconds
@@ -0,0 +1,257 @@
+import argparse
+import math
+import os
+import signal
+import threading
+
+import cv2
+import numpy as np
+
+from dashboard_render import MetricsOverlay
+from engine import build_engine
+from evidence import ENCODINGS
+from journal import FSYNC_POLICIES
+from metrics import Metrics, serve_metrics
+from preprocess import METHODS
+from records import LiveRecords
+from vehicle_db import demo_records
+
+# ----------------------------
+# LAYOUT
+# ----------------------------
+TILE_W, TILE_H = 640, 360
+FOOTER_H = 70
+
+WINDOW = "Smart Toll Gate - Plaza"
+
+# ----------------------------
+# TILE RENDERING
+# ----------------------------
+def draw_lane(tile, lane, selected):
+    frame = lane.frame
+    if frame is None:
+        tile[:] = 0
+    else:
+        # Scaled straight into the canvas, no intermediate image
+        cv2.resize(frame, (TILE_W, TILE_H), dst=tile)
+        if not lane.detect:
+            x1, y1, x2, y2 = lane.box(TILE_W, TILE_H)
+            cv2.rectangle(tile, (x1, y1), (x2, y2), (0, 255, 0), 1)
+
+    if not lane.online:
+        cv2.putText(tile, "NO SIGNAL", (int(TILE_W*0.35), TILE_H // 2),
+                    cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 0, 255), 3)
+
+    dashboard = lane.dashboard
+    cv2.rectangle(tile, (0, 0), (TILE_W, 58), (0, 0, 0), -1)
+    cv2.putText(tile, f"{lane.name}  Plate: {dashboard['plate']}", (10, 24),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 2)
+
+    status_color = (0,255,0) if lane.approved else (0,0,255)
+    cv2.putText(tile, dashboard["status"][:60], (10, 48),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.5, status_color, 1)
+
+    gate_color = (0, 255, 0) if dashboard["gate"] == "OPEN" else (0, 0, 255)
+    cv2.rectangle(tile, (0, TILE_H - 34), (TILE_W, TILE_H), (0, 0, 0), -1)
+    cv2.putText(tile,
+                f"GATE : {dashboard['gate']}   Cash: INR {lane.total_cash}"
+                f"   A:{lane.stats['approved']} R:{lane.stats['rejected']}"
+                f" M:{lane.stats['manual_approved']}"
+                + (f"   Lookup: {lane.last_lookup_ms:.1f} ms"
+                   if lane.last_lookup_ms is not None else ""),
+                (10, TILE_H - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.55,
+                gate_color, 1)
+
+    if lane.processing_in_progress:
+        cv2.putText(tile, "PENDING - press ENTER", (int(TILE_W*0.3), TILE_H - 45),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 2)
+
+    if selected:
+        cv2.rectangle(tile, (0, 0), (TILE_W - 1, TILE_H - 1), (0, 255, 255), 3)
+
+def draw_footer(canvas, lanes, records):
+    footer = canvas[-FOOTER_H:]
+    footer[:] = (30, 30, 30)
+
+    cash = sum(lane.total_cash for lane in lanes)
+    approved = sum(lane.stats["approved"] for lane in lanes)
+    rejected = sum(lane.stats["rejected"] for lane in lanes)
+    manual = sum(lane.stats["manual_approved"] for lane in lanes)
+
+    cv2.putText(footer,
+                f"PLAZA  Lanes: {len(lanes)}  Total Cash: INR {cash}  "
+                f"Approved: {approved}  Rejected: {rejected}  Manual: {manual}  "
+                f"Records: v{records.version} ({records.reload_seconds:.2f}s)",
+                (15, 28), cv2.FONT_HERSHEY_SIMPLEX, 0.65, (255, 255, 255), 2)
+    cv2.putText(footer,
+                "1-9=Select lane | TAB=Next lane | ENTER=Process | "
+                "M=Manual | R=Re-Scan | Q=Quit",
+                (15, 56), cv2.FONT_HERSHEY_SIMPLEX, 0.55, (180, 180, 180), 1)
+
+# ----------------------------
+# PLAZA SETUP
+# ----------------------------
+def add_plaza_args(parser):
+    parser.add_argument("sources", nargs="+",
+                        help="camera indices, video files or stream URLs")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2,
+                        help="OCR worker threads shared by all lanes")
+    parser.add_argument("--ocr", default="auto",
+                        choices=["auto", "tesserocr", "pytesseract"])
+    parser.add_argument("--records",
+                        help="CSV/SQLite records file or directory, or a "
+                             ".tgx index, reloaded when it changes "
+                             "(default: demo lists)")
+    parser.add_argument("--bloom-fp-rate", type=float,
+                        help="put a Bloom filter with this false-positive "
+                             "rate in front of the offense lists")
+    parser.add_argument("--fuzzy-min-confidence", type=float, default=0.8,
+                        help="use a one-edit registry match for unknown "
+                             "plates at this confidence (0 to disable)")
+    parser.add_argument("--detect", action="store_true",
+                        help="find plates anywhere in the frame instead of "
+                             "reading the fixed box")
+    parser.add_argument("--preprocess", default="auto", choices=METHODS,
+                        help="plate binarisation (auto picks from each "
+                             "crop's brightness)")
+    parser.add_argument("--camera-width", type=int,
+                        help="capture width to ask cameras for")
+    parser.add_argument("--camera-height", type=int,
+                        help="capture height to ask cameras for")
+    parser.add_argument("--camera-fps", type=int,
+                        help="frame rate to ask cameras for")
+    parser.add_argument("--camera-buffer", type=int, default=1,
+                        help="frames the camera driver may queue (1 keeps "
+                             "them fresh)")
+    parser.add_argument("--verdict-cache", type=int, default=4096,
+                        help="verdicts kept for repeat plates (0 disables)")
+    parser.add_argument("--journal", default="toll_journal.jsonl",
+                        help="transaction journal; lane counters are "
+                             "restored from it at startup ('' to disable)")
+    parser.add_argument("--journal-fsync", default="interval",
+                        choices=FSYNC_POLICIES)
+    parser.add_argument("--evidence-dir", default="evidence",
+                        help="keep rejection and manual-approval images "
+                             "here ('' to disable)")
+    parser.add_argument("--evidence-format", default="jpg",
+                        choices=sorted(ENCODINGS))
+    parser.add_argument("--evidence-quota-mb", type=int, default=2048,
+                        help="delete the oldest evidence beyond this size")
+    parser.add_argument("--metrics-port", type=int,
+                        help="serve per-stage timings and lane counters in "
+                             "Prometheus format on 127.0.0.1:PORT/metrics")
+
+def camera_settings(args):
+    return {"width": args.camera_width, "height": args.camera_height,
+            "fps": args.camera_fps, "buffer_size": args.camera_buffer}
+
+def build_plaza(args, sound=True, metrics=None, auto_process=False):
+    # Records and an engine with one lane per source; shared by the
+    # windowed plaza and the headless server. `metrics` times the
+    # pipeline stages when given.
+    if args.records:
+        records = LiveRecords(args.records, bloom_fp_rate=args.bloom_fp_rate)
+    else:
+        records = LiveRecords(initial=demo_records(),
+                              bloom_fp_rate=args.bloom_fp_rate)
+
+    engine = build_engine(
+        records, ocr=args.ocr, workers=args.workers,
+        max_pending=2 * len(args.sources),
+        verdict_workers=min(len(args.sources), 4), detect=args.detect,
+        preprocess=args.preprocess,
+        fuzzy_min_confidence=args.fuzzy_min_confidence,
+        verdict_cache=args.verdict_cache, journal=args.journal,
+        journal_fsync=args.journal_fsync, evidence_dir=args.evidence_dir,
+        evidence_format=args.evidence_format,
+        evidence_quota_mb=args.evidence_quota_mb,
+        camera=camera_settings(args), sound=sound, metrics=metrics)
+
+    # Every source opens on its own thread, all at once; a camera that is
+    # not there yet keeps retrying in the background
+    for i, source in enumerate(args.sources):
+        engine.add_lane(f"LANE {i + 1}", source, auto_process=auto_process,
+                        timeout=0)
+    engine.cameras.wait()
+    for lane in engine.lanes:
+        if not lane.source.online:
+            print(f"{lane.name}: no frames from {lane.source.source} yet")
+    if metrics:
+        engine.export(metrics, records)
+    return records, engine
+
+def close_plaza(records, engine):
+    engine.close()
+    records.stop()
+
+# ----------------------------
+# MAIN
+# ----------------------------
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run several toll lanes from one process")
+    add_plaza_args(parser)
+    parser.add_argument("--show-metrics", action="store_true",
+                        help="draw per-stage timings over the lane tiles")
+    args = parser.parse_args()
+
+    metrics = Metrics(enabled=bool(args.metrics_port or args.show_metrics))
+    records, engine = build_plaza(args, metrics=metrics)
+    lanes = engine.lanes
+    server = None
+    overlay = MetricsOverlay(metrics) if args.show_metrics else None
+
+    cols = math.ceil(math.sqrt(len(lanes)))
+    rows = math.ceil(len(lanes) / cols)
+    canvas = np.zeros((rows * TILE_H + FOOTER_H, cols * TILE_W, 3),
+                      dtype=np.uint8)
+    selected = 0
+
+    # Ctrl-C and SIGTERM end the loop like Q, and whatever ends it the
+    # engine is closed on the way out, so the journal and queued evidence
+    # writes are flushed
+    stop = threading.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda signum, frame: stop.set())
+
+    try:
+        if args.metrics_port:
+            server = serve_metrics(metrics, args.metrics_port)
+
+        while not stop.is_set():
+            engine.step()
+            for i, lane in enumerate(lanes):
+                r, c = divmod(i, cols)
+                tile = canvas[r*TILE_H:(r+1)*TILE_H, c*TILE_W:(c+1)*TILE_W]
+                with metrics("render"):
+                    draw_lane(tile, lane, i == selected)
+
+            with metrics("render"):
+                draw_footer(canvas, lanes, records)
+            if overlay:
+                overlay.draw(canvas, canvas.shape[1] - 340, 10)
+            with metrics("imshow"):
+                cv2.imshow(WINDOW, canvas)
+                key = cv2.waitKey(1) & 0xFF
+            lane = lanes[selected]
+
+            if key == 13:
+                lane.process()
+            elif key == ord('m'):
+                lane.manual_approve()
+            elif key == ord('r'):
+                lane.rescan()
+            elif key == 9:
+                selected = (selected + 1) % len(lanes)
+            elif ord('1') <= key <= ord('9') and key - ord('1') < len(lanes):
+                selected = key - ord('1')
+            elif key == ord('q'):
+                break
+    finally:
+        if server:
+            server.shutdown()
+        close_plaza(records, engine)
+        cv2.destroyAllWindows()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+import threading
+
+import numpy as np
+import pytesseract
+
+try:
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
+PLATE_CHARS = "ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"
+OCR_CONFIG = f"--oem 3 --psm 7 -c tessedit_char_whitelist={PLATE_CHARS}"
+
+# Every backend takes a grayscale/binary uint8 numpy image and returns
+# (text, confidence). confidence is 0-100, or None when the engine cannot
+# report one.
+
+# ----------------------------
+# PYTESSERACT (FALLBACK)
+# ----------------------------
+class PytesseractBackend:
+    # Forks the tesseract binary and goes through a temp file per call
+
+    name = "pytesseract"
+
+    def read(self, image):
+        text = pytesseract.image_to_string(image, config=OCR_CONFIG)
+        return text, None
+
+    def close(self):
+        pass
+
+# ----------------------------
+# TESSEROCR (PERSISTENT ENGINE)
+# ----------------------------
+class TesserocrBackend:
+    # Keeps one TessBaseAPI per worker thread: the model is loaded once
+    # and images are handed over as raw buffers, with no process spawn
+    # and no temp files. tesserocr drops the GIL while recognising, so
+    # the worker threads really do run in parallel.
+
+    name = "tesserocr"
+
+    def __init__(self, lang="eng"):
+        if tesserocr is None:
+            raise RuntimeError("tesserocr is not installed")
+        self.lang = lang
+        self._local = threading.local()
+        self._apis = []
+        self._lock = threading.Lock()
+
+    def _api(self):
+        api = getattr(self._local, "api", None)
+        if api is None:
+            api = tesserocr.PyTessBaseAPI(lang=self.lang,
+                                          psm=tesserocr.PSM.SINGLE_LINE)
+            api.SetVariable("tessedit_char_whitelist", PLATE_CHARS)
+            self._local.api = api
+            with self._lock:
+                self._apis.append(api)
+        return api
+
+    def read(self, image):
+        image = np.ascontiguousarray(image)
+        h, w = image.shape[:2]
+        bpp = 1 if image.ndim == 2 else image.shape[2]
+
+        api = self._api()
+        api.SetImageBytes(image.tobytes(), w, h, bpp, w * bpp)
+        return api.GetUTF8Text(), api.MeanTextConf()
+
+    def close(self):
+        with self._lock:
+            for api in self._apis:
+                api.End()
+            self._apis = []
+
+# ----------------------------
+# FACTORY
+# ----------------------------
+def make_ocr_backend(name="auto"):
+    if name == "pytesseract":
+        return PytesseractBackend()
+    if name == "tesserocr" or (name == "auto" and tesserocr is not None):
+        return TesserocrBackend()
+    if name == "auto":
+        return PytesseractBackend()
+    raise ValueError(f"Unknown OCR backend: {name}")
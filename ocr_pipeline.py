@@ -0,0 +1,147 @@
+import queue
+import threading
+
+from metrics import null_timer
+from ocr_backend import make_ocr_backend
+from preprocess import Preprocessor
+
+# ----------------------------
+# OCR
+# ----------------------------
+DEFAULT_PREPROCESSOR = Preprocessor()
+
+def read_plate(roi, backend, timer=null_timer, preprocess=None):
+    thresh = (preprocess or DEFAULT_PREPROCESSOR)(roi, timer)
+
+    with timer("ocr"):
+        text, confidence = backend.read(thresh)
+    return text.strip().replace(" ", "").replace("\n", ""), confidence
+
+# ----------------------------
+# OCR WORKER POOL
+# ----------------------------
+class OCRWorkerPool:
+    # Frames are queued in a small bounded queue. When it is full the
+    # oldest job is dropped: a stale frame is worth nothing to the lane.
+    #
+    # A job submitted with box=None is searched by `detector` (a
+    # PlateDetector) and its deskewed candidates are read best first,
+    # stopping at the first reading `accept` takes. Results come back with
+    # the box that was read, so the lane knows where the plate was.
+    #
+    # A job whose read raises (no tesseract binary, a broken model) is
+    # dropped like a stale one, but counted in `errors` with the last
+    # message in `error`, so a lane that never reads a plate shows why.
+
+    def __init__(self, backend=None, workers=2, max_pending=2,
+                 timer=null_timer, detector=None, accept=None,
+                 preprocess=None):
+        self.backend = backend or make_ocr_backend()
+        self.timer = timer
+        self.preprocess = preprocess or Preprocessor()
+        self.detector = detector
+        self.accept = accept
+        self.jobs = queue.Queue(maxsize=max_pending)
+        self.results = queue.Queue()
+        self.generations = {}
+        self.submitted = 0
+        self.dropped = 0
+        self.errors = 0
+        self.error = None
+        self._threads = [
+            threading.Thread(target=self._worker, daemon=True)
+            for _ in range(workers)
+        ]
+        for t in self._threads:
+            t.start()
+
+    def submit(self, frame, box, tag=None):
+        # `tag` identifies the lane a frame came from when several lanes
+        # share the pool; it is handed back with the result. box=None
+        # leaves finding the plate to the detector
+        job = (tag, self.generations.setdefault(tag, 0), frame, box)
+        while True:
+            try:
+                self.jobs.put_nowait(job)
+                self.submitted += 1
+                return
+            except queue.Full:
+                try:
+                    self.jobs.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def _worker(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                return
+            tag, generation, frame, box = job
+            try:
+                result = self._read(frame, box)
+            except Exception as e:
+                self.errors += 1
+                self.error = f"{type(e).__name__}: {e}"
+                continue
+            if result:
+                self.results.put((tag, generation, *result, frame))
+
+    def _read(self, frame, box):
+        if box is None:
+            with self.timer("detect"):
+                candidates = [(c.box, c.crop)
+                              for c in self.detector.detect(frame)]
+        else:
+            x1, y1, x2, y2 = box
+            candidates = [(box, frame[y1:y2, x1:x2])]
+
+        result = None
+        for box, crop in candidates:
+            result = read_plate(crop, self.backend, self.timer,
+                                self.preprocess) + (box,)
+            if not self.accept or self.accept(result[0]):
+                break
+        return result
+
+    def poll(self):
+        # Results of frames submitted before the last flush() are discarded
+        out = []
+        while True:
+            try:
+                tag, generation, *result = self.results.get_nowait()
+            except queue.Empty:
+                return out
+            if generation == self.generations.get(tag, 0):
+                out.append((tag, *result))
+
+    def flush(self, tag=None):
+        self.generations[tag] = self.generations.get(tag, 0) + 1
+
+        kept = []
+        while True:
+            try:
+                job = self.jobs.get_nowait()
+            except queue.Empty:
+                break
+            if job[0] != tag:
+                kept.append(job)
+        for job in kept:
+            self.jobs.put_nowait(job)
+
+    def flush_all(self):
+        for tag in list(self.generations):
+            self.generations[tag] += 1
+        while True:
+            try:
+                self.jobs.get_nowait()
+            except queue.Empty:
+                return
+
+    def close(self):
+        self.flush_all()
+        for _ in self._threads:
+            self.jobs.put(None)
+        for t in self._threads:
+            t.join(timeout=1.0)
+        self.backend.close()
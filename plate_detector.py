@@ -0,0 +1,134 @@
+import math
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+# ----------------------------
+# PLATE DETECTOR
+# ----------------------------
+# box is the axis-aligned (x1, y1, x2, y2) around the plate in frame
+# coordinates, crop the deskewed plate image, score higher is better
+PlateCandidate = namedtuple("PlateCandidate", "box crop score")
+
+class PlateDetector:
+    # Finds plate-shaped regions anywhere in the frame so only tight crops
+    # go to OCR. Plates are rows of sharp vertical strokes on a flat
+    # background: a horizontal Sobel gradient, Otsu threshold and a wide
+    # closing turn the characters into one solid blob per plate, and the
+    # blobs whose rotated rectangle has the proportions of a row of plate
+    # characters are warped upright, with a margin, from the
+    # full-resolution frame.
+    #
+    # Cost is bounded: detection runs on a copy at most `work_width`
+    # pixels wide, only the `max_contours` largest blobs are examined and
+    # at most `max_candidates` crops are returned.
+
+    def __init__(self, work_width=640, min_aspect=2.0, max_aspect=11.0,
+                 aspect=6.0, min_area=0.002, max_area=0.2, min_fill=0.45,
+                 max_contours=30, max_candidates=2, pad_x=0.08, pad_y=0.3,
+                 out_height=64):
+        self.work_width = work_width
+        self.min_aspect = min_aspect
+        self.max_aspect = max_aspect
+        self.aspect = aspect
+        self.min_area = min_area
+        self.max_area = max_area
+        self.min_fill = min_fill
+        self.max_contours = max_contours
+        self.max_candidates = max_candidates
+        self.pad_x = pad_x
+        self.pad_y = pad_y
+        self.out_height = out_height
+
+        self.close_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (17, 5))
+        self.open_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (5, 3))
+
+        self.frames = 0
+        self.detections = 0
+
+    def _mask(self, gray):
+        grad = cv2.Sobel(gray, cv2.CV_16S, 1, 0, ksize=3)
+        grad = cv2.convertScaleAbs(grad)
+        _, mask = cv2.threshold(grad, 0, 255,
+                                cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+        mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, self.close_kernel)
+        return cv2.morphologyEx(mask, cv2.MORPH_OPEN, self.open_kernel)
+
+    def _rects(self, mask):
+        # Rotated rectangles of the largest blobs with plate proportions,
+        # scored by how solid the blob is and how close its aspect ratio
+        # is to a plate's
+        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL,
+                                       cv2.CHAIN_APPROX_SIMPLE)
+        if not contours:
+            return []
+        areas = np.array([cv2.contourArea(c) for c in contours])
+        frame_area = mask.shape[0] * mask.shape[1]
+        keep = np.flatnonzero((areas >= self.min_area * frame_area)
+                              & (areas <= self.max_area * frame_area))
+        keep = keep[np.argsort(areas[keep])[::-1][:self.max_contours]]
+
+        rects = []
+        for i in keep:
+            rect = cv2.minAreaRect(contours[i])
+            (cx, cy), (rw, rh), angle = rect
+            if rw < rh:
+                rw, rh, angle = rh, rw, angle - 90
+            if rh < 4:
+                continue
+            aspect = rw / rh
+            fill = areas[i] / (rw * rh)
+            if not (self.min_aspect <= aspect <= self.max_aspect
+                    and fill >= self.min_fill):
+                continue
+            score = fill * math.exp(-abs(math.log(aspect / self.aspect)))
+            rects.append((score, ((cx, cy), (rw, rh), angle)))
+        rects.sort(key=lambda r: r[0], reverse=True)
+        return rects[:self.max_candidates]
+
+    def _warp(self, frame, rect, scale):
+        # Cut the rotated rectangle out of the full-resolution frame and
+        # rotate it level, with a little margin around the characters
+        (cx, cy), (rw, rh), angle = rect
+        cx, cy = cx / scale, cy / scale
+        rw = rw / scale * (1 + 2 * self.pad_x)
+        rh = rh / scale * (1 + 2 * self.pad_y)
+
+        out_h = self.out_height
+        out_w = max(int(out_h * rw / rh), 1)
+        k = out_h / rh
+        a = math.radians(angle)
+        cos, sin = math.cos(a) * k, math.sin(a) * k
+        # Affine map from the frame to the upright crop: rotate by -angle
+        # about the centre, scale to out_h and move the centre to the
+        # middle of the crop
+        m = np.array([[cos, sin, out_w / 2 - cos * cx - sin * cy],
+                      [-sin, cos, out_h / 2 + sin * cx - cos * cy]])
+        crop = cv2.warpAffine(frame, m, (out_w, out_h),
+                              flags=cv2.INTER_LINEAR,
+                              borderMode=cv2.BORDER_REPLICATE)
+
+        corners = cv2.boxPoints(((cx, cy), (rw, rh), angle))
+        h, w = frame.shape[:2]
+        x1, y1 = np.clip(corners.min(axis=0), 0, [w, h]).astype(int)
+        x2, y2 = np.clip(corners.max(axis=0), 0, [w, h]).astype(int)
+        return (int(x1), int(y1), int(x2), int(y2)), crop
+
+    def detect(self, frame):
+        h, w = frame.shape[:2]
+        scale = min(1.0, self.work_width / w)
+        small = frame if scale == 1.0 else cv2.resize(
+            frame, (int(w * scale), int(h * scale)),
+            interpolation=cv2.INTER_AREA)
+        gray = small if small.ndim == 2 else cv2.cvtColor(
+            small, cv2.COLOR_BGR2GRAY)
+
+        candidates = []
+        for score, rect in self._rects(self._mask(gray)):
+            box, crop = self._warp(frame, rect, scale)
+            candidates.append(PlateCandidate(box, crop, score))
+
+        self.frames += 1
+        self.detections += len(candidates)
+        return candidates
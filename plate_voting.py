@@ -0,0 +1,85 @@
+from collections import Counter, defaultdict, deque, namedtuple
+
+Consensus = namedtuple("Consensus", "plate frames agreement payload")
+
+# ----------------------------
+# TEMPORAL PLATE VOTING
+# ----------------------------
+class PlateVoter:
+    # Keeps the OCR readings of the last `window` frames for one lane and
+    # votes per character position, each reading weighted by its OCR
+    # confidence. A plate is committed only when at least `min_votes`
+    # readings agree on its length and every position's winning character
+    # holds `agreement` of the total weight in the window, so a single
+    # misread can no longer lock the lane on a wrong plate. `normalize` is
+    # applied to every reading before it is counted.
+
+    def __init__(self, window=8, min_votes=3, agreement=0.6, validate=None,
+                 normalize=None):
+        self.window = window
+        self.min_votes = min_votes
+        self.agreement = agreement
+        self.validate = validate
+        self.normalize = normalize
+
+        self.readings = deque(maxlen=window)
+        self.frames = 0
+        self.last_decision_frames = 0
+
+    def add(self, text, confidence=None, payload=None):
+        if not text:
+            return None
+        if self.normalize:
+            text = self.normalize(text)
+
+        weight = 1.0 if confidence is None else max(confidence, 1) / 100.0
+        self.readings.append((text, weight, payload))
+        self.frames += 1
+
+        consensus = self._decide()
+        if consensus:
+            self.last_decision_frames = consensus.frames
+            self.reset()
+        return consensus
+
+    def _decide(self):
+        total = sum(weight for _, weight, _ in self.readings)
+
+        by_length = Counter()
+        for text, weight, _ in self.readings:
+            by_length[len(text)] += weight
+        length = max(by_length, key=by_length.get)
+
+        same_length = [r for r in self.readings if len(r[0]) == length]
+        if len(same_length) < self.min_votes:
+            return None
+
+        chars = []
+        agreement = 1.0
+        for i in range(length):
+            votes = defaultdict(float)
+            for text, weight, _ in same_length:
+                votes[text[i]] += weight
+            char = max(votes, key=votes.get)
+            agreement = min(agreement, votes[char] / total)
+            chars.append(char)
+
+        if agreement < self.agreement:
+            return None
+
+        plate = "".join(chars)
+        if self.validate and not self.validate(plate):
+            return None
+
+        # Freeze on the newest frame that actually read the winning plate
+        payload = same_length[-1][2]
+        for text, _, p in reversed(same_length):
+            if text == plate:
+                payload = p
+                break
+
+        return Consensus(plate, self.frames, agreement, payload)
+
+    def reset(self):
+        self.readings.clear()
+        self.frames = 0
@@ -0,0 +1,103 @@
+import threading
+from collections import Counter
+
+import cv2
+import numpy as np
+
+METHODS = ("auto", "fixed", "otsu", "adaptive", "clahe")
+
+# ----------------------------
+# PLATE PREPROCESSING
+# ----------------------------
+class Preprocessor:
+    # Turns a plate crop into the binary image OCR reads.
+    #
+    # The crop is converted to gray first and only the single channel is
+    # scaled up, and every stage writes into buffers kept per thread and
+    # per crop size, so a steady camera allocates nothing per frame. The
+    # returned image is one of those buffers: it is only valid until the
+    # same thread preprocesses its next crop.
+    #
+    # Thresholds:
+    #   fixed     the old cv2.threshold(gray, 150), kept for comparison
+    #   otsu      global threshold picked from the crop's histogram
+    #   adaptive  local mean threshold, for glare and uneven light
+    #   clahe     local contrast equalisation then Otsu, for night
+    #   auto      picks one of the above from the crop's measured
+    #             brightness and contrast
+
+    def __init__(self, method="auto", scale=2.5, fixed_level=150, dark=70,
+                 bright=185, low_contrast=35, block_size=31, c=10):
+        if method not in METHODS:
+            raise ValueError(f"unknown preprocessing method {method!r}")
+        self.method = method
+        self.scale = scale
+        self.fixed_level = fixed_level
+        self.dark = dark
+        self.bright = bright
+        self.low_contrast = low_contrast
+        self.block_size = block_size
+        self.c = c
+
+        self.used = Counter()
+        self._local = threading.local()
+
+    def _buffers(self, shape):
+        # gray, scaled and binary buffers for one crop size on this thread
+        local = self._local
+        if getattr(local, "shape", None) != shape:
+            h, w = shape
+            big = (int(round(h * self.scale)), int(round(w * self.scale)))
+            local.shape = shape
+            local.gray = np.empty((h, w), dtype=np.uint8)
+            local.equalized = np.empty((h, w), dtype=np.uint8)
+            local.big = np.empty(big, dtype=np.uint8)
+            local.out = np.empty(big, dtype=np.uint8)
+            local.clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(2, 8))
+        return local
+
+    def choose(self, gray):
+        # Night frames are dark, glare washes a plate out and flattens its
+        # contrast; everything else thresholds fine globally
+        if self.method != "auto":
+            return self.method
+        mean, std = cv2.meanStdDev(gray)
+        mean, std = mean[0, 0], std[0, 0]
+        if mean < self.dark:
+            return "clahe"
+        if mean > self.bright or std < self.low_contrast:
+            return "adaptive"
+        return "otsu"
+
+    def __call__(self, roi, timer):
+        buf = self._buffers(roi.shape[:2])
+
+        with timer("gray"):
+            if roi.ndim == 2:
+                gray = roi
+            else:
+                gray = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY, dst=buf.gray)
+            method = self.choose(gray)
+            if method == "clahe":
+                # Equalised before scaling: same effect, 1/scale^2 the
+                # pixels
+                gray = buf.clahe.apply(gray, dst=buf.equalized)
+        self.used[method] += 1
+
+        with timer("resize"):
+            big = cv2.resize(gray, (buf.big.shape[1], buf.big.shape[0]),
+                             dst=buf.big, interpolation=cv2.INTER_LINEAR)
+
+        with timer("threshold"):
+            out = buf.out
+            if method == "fixed":
+                cv2.threshold(big, self.fixed_level, 255, cv2.THRESH_BINARY,
+                              dst=out)
+            elif method in ("otsu", "clahe"):
+                cv2.threshold(big, 0, 255,
+                              cv2.THRESH_BINARY | cv2.THRESH_OTSU, dst=out)
+            elif method == "adaptive":
+                cv2.adaptiveThreshold(big, 255, cv2.ADAPTIVE_THRESH_MEAN_C,
+                                      cv2.THRESH_BINARY, self.block_size,
+                                      self.c, dst=out)
+        return out
@@ -0,0 +1,772 @@
+import bisect
+import csv
+import enum
+import mmap
+import os
+import re
+import sqlite3
+import struct
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from bloom import BloomFilter
+
+# ----------------------------
+# OFFENSE BITS
+# ----------------------------
+CRIMINAL = 1
+TRAFFIC = 2
+INSURANCE = 4
+PUC = 8
+ACCIDENT = 16
+
+# (bit, category name used in record files, text shown on the dashboard)
+OFFENSES = [
+    (CRIMINAL, "criminal", "Criminal Record"),
+    (TRAFFIC, "traffic", "Traffic Violations"),
+    (INSURANCE, "insurance", "Insurance Expired"),
+    (PUC, "puc", "PUC Invalid"),
+    (ACCIDENT, "accident", "Accident Record"),
+]
+
+VALID_CATEGORY = "valid"
+CATEGORY_BITS = {name: bit for bit, name, _ in OFFENSES}
+
+# Verdict masks (bulk checks) are the offense bits plus this one for a
+# plate missing from the registry, check_vehicle's "Invalid License".
+# A mask of 0 is an approval.
+UNREGISTERED = 32
+
+def is_valid_plate(text):
+    return re.match(r"^[A-Z]{2}[0-9]{2}[A-Z]{2}[0-9]{4}$", text)
+
+# ----------------------------
+# PLATE ENCODING
+# ----------------------------
+# A plate of up to 12 characters from 0-9A-Z is packed base 37 into one
+# int64 (37**12 < 2**63). Characters map to 1..36, so 0 never encodes a
+# real plate and can mark empty slots and unencodable input.
+PLATE_WIDTH = 12
+ALPHABET = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+_CHAR_CODE = np.zeros(256, dtype=np.int64)
+for _i, _c in enumerate(ALPHABET):
+    _CHAR_CODE[ord(_c)] = _i + 1
+
+def encode_plate(plate):
+    if not plate or len(plate) > PLATE_WIDTH:
+        return 0
+    key = 0
+    for c in plate:
+        code = ALPHABET.find(c) + 1
+        if code == 0:
+            return 0
+        key = key * 37 + code
+    return key * 37 ** (PLATE_WIDTH - len(plate))
+
+def encode_plates(plates):
+    # Vectorised encode_plate(); unencodable plates come back as 0
+    try:
+        raw = np.asarray(plates, dtype=f"S{PLATE_WIDTH + 1}")
+    except UnicodeEncodeError:
+        # Non-ASCII characters become "?", which is outside the alphabet
+        raw = np.asarray([p.encode("ascii", "replace") if isinstance(p, str)
+                          else p for p in plates],
+                         dtype=f"S{PLATE_WIDTH + 1}")
+    if raw.size == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    chars = raw.view(np.uint8).reshape(len(raw), PLATE_WIDTH + 1)
+
+    # One column at a time keeps the temporaries at 8 bytes per plate.
+    # Characters outside the alphabet and over-long plates are rejected.
+    keys = np.zeros(len(raw), dtype=np.int64)
+    bad = chars[:, PLATE_WIDTH] != 0
+    for i in range(PLATE_WIDTH):
+        code = _CHAR_CODE[chars[:, i]]
+        bad |= (code == 0) & (chars[:, i] != 0)
+        keys *= 37
+        keys += code
+
+    keys[bad] = 0
+    return keys
+
+def decode_plate(key):
+    key = int(key)
+    chars = []
+    for _ in range(PLATE_WIDTH):
+        key, code = divmod(key, 37)
+        if code:
+            chars.append(ALPHABET[code - 1])
+    return "".join(reversed(chars))
+
+# ----------------------------
+# HASH INDEX
+# ----------------------------
+_HASH_MUL = 0x9E3779B97F4A7C15
+_MASK64 = (1 << 64) - 1
+
+class PlateIndex:
+    # Open-addressing hash table over encoded plates held in two flat
+    # numpy arrays (int64 keys, uint8 values): about 9 bytes per slot and
+    # O(1) expected lookups. Built fully vectorised, so tens of millions of
+    # plates index in seconds.
+
+    def __init__(self, keys, values=None, load=0.5):
+        keys = np.asarray(keys, dtype=np.int64)
+        if values is None:
+            values = np.ones(len(keys), dtype=np.uint8)
+        values = np.asarray(values, dtype=np.uint8)
+
+        self.bits = max(4, int(np.ceil(np.log2(max(len(keys), 1) / load))))
+        self.shift = 64 - self.bits
+        self.mask = (1 << self.bits) - 1
+        self.slots = np.zeros(1 << self.bits, dtype=np.int64)
+        self.values = np.zeros(1 << self.bits, dtype=np.uint8)
+        self.size = len(keys)
+
+        idx = np.arange(len(keys))
+        pos = self._hash(keys)
+        while idx.size:
+            # Scatter every key into its slot if free; when several keys
+            # want the same slot one write wins and the rest probe on
+            free = self.slots[pos] == 0
+            self.slots[pos[free]] = keys[idx[free]]
+            landed = free & (self.slots[pos] == keys[idx])
+            self.values[pos[landed]] = values[idx[landed]]
+
+            idx = idx[~landed]
+            pos = (pos[~landed] + 1) & self.mask
+
+    def _hash(self, keys):
+        h = keys.astype(np.uint64) * np.uint64(_HASH_MUL)
+        return (h >> np.uint64(self.shift)).astype(np.int64)
+
+    def get(self, key, default=0):
+        slots = self.slots
+        i = ((key * _HASH_MUL) & _MASK64) >> self.shift
+        while True:
+            k = slots[i]
+            if k == key:
+                return int(self.values[i])
+            if k == 0:
+                return default
+            i = (i + 1) & self.mask
+
+    def __contains__(self, key):
+        return self.get(key, 0) != 0
+
+    def get_many(self, keys, default=0):
+        keys = np.asarray(keys, dtype=np.int64)
+        out = np.full(len(keys), default, dtype=np.uint8)
+
+        active = np.arange(len(keys))
+        pos = self._hash(keys)
+        while active.size:
+            k = self.slots[pos]
+            hit = k == keys[active]
+            out[active[hit]] = self.values[pos[hit]]
+            more = ~hit & (k != 0)
+            active = active[more]
+            pos = (pos[more] + 1) & self.mask
+        return out
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def nbytes(self):
+        return self.slots.nbytes + self.values.nbytes
+
+# ----------------------------
+# RECORDS STORE
+# ----------------------------
+def _first_of_run(sorted_keys):
+    # np.unique() is far slower than a sort plus a neighbour compare here
+    first = np.ones(len(sorted_keys), dtype=bool)
+    first[1:] = sorted_keys[1:] != sorted_keys[:-1]
+    return first
+
+def sorted_arrays(valid_keys, offense_keys, offense_bits):
+    # Raw encoded rows -> (sorted unique registered keys, sorted unique
+    # offense keys, OR-ed offense mask per offense key)
+    valid_keys = np.sort(valid_keys[valid_keys != 0])
+    valid_keys = valid_keys[_first_of_run(valid_keys)]
+
+    keep = offense_keys != 0
+    offense_keys, offense_bits = offense_keys[keep], offense_bits[keep]
+    order = np.argsort(offense_keys, kind="stable")
+    offense_keys = offense_keys[order]
+    offense_bits = offense_bits[order].astype(np.uint8)
+
+    starts = np.flatnonzero(_first_of_run(offense_keys))
+    masks = (np.bitwise_or.reduceat(offense_bits, starts)
+             if len(starts) else np.zeros(0, dtype=np.uint8))
+    return valid_keys, offense_keys[starts], masks.astype(np.uint8)
+
+def rows_to_arrays(rows, chunk=1_000_000):
+    # rows: iterable of (plate, category). Read in chunks so only one
+    # chunk of Python strings is alive at a time.
+    valid, offense_keys, offense_bits = [], [], []
+
+    def flush(plates, bits):
+        keys = encode_plates(plates)
+        bits = np.asarray(bits, dtype=np.uint8)
+        valid.append(keys[bits == 0])
+        offense_keys.append(keys[bits != 0])
+        offense_bits.append(bits[bits != 0])
+
+    plates, bits = [], []
+    for plate, category in rows:
+        category = category.strip().lower()
+        if category == VALID_CATEGORY:
+            bit = 0
+        elif category in CATEGORY_BITS:
+            bit = CATEGORY_BITS[category]
+        else:
+            continue
+        plates.append(plate.strip().upper())
+        bits.append(bit)
+        if len(plates) >= chunk:
+            flush(plates, bits)
+            plates, bits = [], []
+    flush(plates, bits)
+
+    return sorted_arrays(np.concatenate(valid),
+                         np.concatenate(offense_keys),
+                         np.concatenate(offense_bits))
+
+class BaseRecords:
+    # Lookup logic shared by the in-memory and memory-mapped stores.
+    # Subclasses provide sorted registered_keys / offense_keys /
+    # offense_masks arrays plus _registered(key) and _offense_mask(key).
+
+    def _init_bloom(self):
+        self.bloom = None
+        self.bloom_negatives = 0
+        self.bloom_positives = 0
+        self.bloom_false_positives = 0
+
+    def enable_bloom(self, fp_rate=0.01, max_bytes=None):
+        # Optional filter over every plate on an offense list. A clean
+        # plate is almost always rejected by the filter, which skips the
+        # exact offense lookup entirely.
+        self.bloom = BloomFilter(self.offense_keys, fp_rate, max_bytes)
+        return self
+
+    def lookup(self, plate):
+        # -> (registered, offense mask)
+        key = encode_plate(plate)
+        if not key:
+            return False, 0
+        registered = self._registered(key)
+
+        if self.bloom is not None:
+            if key not in self.bloom:
+                self.bloom_negatives += 1
+                return registered, 0
+            self.bloom_positives += 1
+            mask = self._offense_mask(key)
+            if not mask:
+                self.bloom_false_positives += 1
+            return registered, mask
+
+        return registered, self._offense_mask(key)
+
+    # ---------------- BULK LOOKUPS ----------------
+    def registered_many(self, keys):
+        return _in_sorted(self.registered_keys, keys)
+
+    def offense_masks_many(self, keys):
+        keys = np.asarray(keys, dtype=np.int64)
+        out = np.zeros(len(keys), dtype=np.uint8)
+        if len(self.offense_keys):
+            i = np.searchsorted(self.offense_keys, keys)
+            i[i == len(self.offense_keys)] = 0
+            hit = self.offense_keys[i] == keys
+            out[hit] = self.offense_masks[i[hit]]
+        return out
+
+    def known_many(self, keys):
+        # Plate is registered or on any offense list
+        return self.registered_many(keys) | (self.offense_masks_many(keys) != 0)
+
+    def verdict_masks_many(self, keys):
+        # One verdict mask per encoded plate; unencodable plates (key 0)
+        # are unregistered. The Bloom filter is not consulted: a batch
+        # probes the hash indexes at full speed anyway.
+        keys = np.asarray(keys, dtype=np.int64)
+        masks = self.offense_masks_many(keys)
+        masks[~self.registered_many(keys)] |= UNREGISTERED
+        return masks
+
+    def __len__(self):
+        return len(self.registered_keys)
+
+def _in_sorted(sorted_keys, keys):
+    keys = np.asarray(keys, dtype=np.int64)
+    if not len(sorted_keys):
+        return np.zeros(len(keys), dtype=bool)
+    i = np.searchsorted(sorted_keys, keys)
+    i[i == len(sorted_keys)] = 0
+    return sorted_keys[i] == keys
+
+class RecordsStore(BaseRecords):
+    # Registered plates and the offense lists, kept apart the same way the
+    # old VALID_LICENSE set was kept apart from the offense sets:
+    #   registry  - every plate with a valid licence
+    #   offenses  - plate -> OR of the offense bits it is listed under
+    # The sorted key arrays are kept alongside the hash indexes for bulk
+    # and on-disk use.
+
+    def __init__(self, registered_keys, offense_keys, offense_masks):
+        self.registered_keys = registered_keys
+        self.offense_keys = offense_keys
+        self.offense_masks = offense_masks
+
+        self.registry = PlateIndex(registered_keys)
+        self.offenses = PlateIndex(offense_keys, offense_masks)
+        self._init_bloom()
+
+    @classmethod
+    def from_arrays(cls, valid_keys, offense_keys, offense_bits):
+        return cls(*sorted_arrays(valid_keys, offense_keys, offense_bits))
+
+    @classmethod
+    def from_sets(cls, valid, offenses):
+        # offenses: {offense bit: iterable of plates}
+        offense_keys = [encode_plates(sorted(plates))
+                        for plates in offenses.values()]
+        offense_bits = [np.full(len(k), bit, dtype=np.uint8)
+                        for bit, k in zip(offenses, offense_keys)]
+        return cls.from_arrays(
+            encode_plates(sorted(valid)),
+            np.concatenate(offense_keys or [np.zeros(0, np.int64)]),
+            np.concatenate(offense_bits or [np.zeros(0, np.uint8)]))
+
+    @classmethod
+    def from_rows(cls, rows):
+        return cls(*rows_to_arrays(rows))
+
+    @classmethod
+    def from_csv(cls, path):
+        return cls.from_rows(csv_rows(path))
+
+    @classmethod
+    def from_sqlite(cls, path, table="vehicle_records"):
+        return cls.from_rows(sqlite_rows(path, table))
+
+    def _registered(self, key):
+        return key in self.registry
+
+    def _offense_mask(self, key):
+        return self.offenses.get(key, 0)
+
+    def registered_many(self, keys):
+        return self.registry.get_many(keys) != 0
+
+    def offense_masks_many(self, keys):
+        return self.offenses.get_many(keys)
+
+    @property
+    def nbytes(self):
+        return (self.registered_keys.nbytes + self.offense_keys.nbytes
+                + self.offense_masks.nbytes + self.registry.nbytes
+                + self.offenses.nbytes
+                + (self.bloom.nbytes if self.bloom else 0))
+
+# ----------------------------
+# MEMORY-MAPPED INDEX
+# ----------------------------
+# Compiled index file (build_index.py), little-endian:
+#   header  64 bytes: magic, version, n_registered, n_offenses and the
+#           byte offsets of the three arrays
+#   int64   sorted registered keys
+#   int64   sorted offense keys
+#   uint8   offense mask per offense key
+# Arrays start on 64-byte boundaries so they can be viewed in place.
+INDEX_MAGIC = b"TOLLIDX1"
+INDEX_VERSION = 1
+INDEX_EXTENSION = ".tgx"
+_HEADER = struct.Struct("<8sIIQQQQQ")
+
+def _align(offset):
+    return (offset + 63) // 64 * 64
+
+def write_index(path, registered_keys, offense_keys, offense_masks):
+    # Written to a temp file and renamed into place, so a lane mapping or
+    # reloading the index never sees a half-written file
+    reg_off = _align(_HEADER.size)
+    off_keys_off = _align(reg_off + registered_keys.nbytes)
+    off_masks_off = _align(off_keys_off + offense_keys.nbytes)
+
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, 0,
+                             len(registered_keys), len(offense_keys),
+                             reg_off, off_keys_off, off_masks_off))
+        for offset, array in ((reg_off, registered_keys.astype("<i8")),
+                              (off_keys_off, offense_keys.astype("<i8")),
+                              (off_masks_off, offense_masks.astype(np.uint8))):
+            f.seek(offset)
+            f.write(array.tobytes())
+        f.truncate(off_masks_off + len(offense_masks))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+class MmapRecords(BaseRecords):
+    # Read-only view of a compiled index. Nothing is parsed or copied on
+    # open, so startup time does not depend on the list size, and every
+    # lane process on the host shares the same page-cache pages. Lookups
+    # binary-search the mapped arrays through memoryviews (bisect runs
+    # in C), about two dozen page-cache reads for 50M plates.
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        (magic, version, _, n_reg, n_off,
+         reg_off, off_keys_off, off_masks_off) = _HEADER.unpack_from(self._mm)
+        if magic != INDEX_MAGIC or version != INDEX_VERSION:
+            raise ValueError(f"Not a plate index: {path}")
+
+        self.registered_keys = np.frombuffer(self._mm, dtype="<i8",
+                                             count=n_reg, offset=reg_off)
+        self.offense_keys = np.frombuffer(self._mm, dtype="<i8",
+                                          count=n_off, offset=off_keys_off)
+        self.offense_masks = np.frombuffer(self._mm, dtype=np.uint8,
+                                           count=n_off, offset=off_masks_off)
+
+        view = memoryview(self._mm)
+        self._reg = view[reg_off:reg_off + n_reg * 8].cast("q")
+        self._off = view[off_keys_off:off_keys_off + n_off * 8].cast("q")
+        self._masks = view[off_masks_off:off_masks_off + n_off]
+        self._init_bloom()
+
+    def _registered(self, key):
+        i = bisect.bisect_left(self._reg, key)
+        return i < len(self._reg) and self._reg[i] == key
+
+    def _offense_mask(self, key):
+        i = bisect.bisect_left(self._off, key)
+        if i < len(self._off) and self._off[i] == key:
+            return self._masks[i]
+        return 0
+
+    @property
+    def nbytes(self):
+        # Resident cost is the page cache, shared between processes
+        return self.bloom.nbytes if self.bloom else 0
+
+# ----------------------------
+# RECORD FILES
+# ----------------------------
+RECORD_EXTENSIONS = (".csv", ".db", ".sqlite", ".sqlite3")
+
+def csv_rows(path):
+    # CSV with a "plate,category" header; category is "valid" or one of
+    # the offense names in OFFENSES. A plate listed under several
+    # categories simply appears on several rows.
+    with open(path, newline="") as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        for row in reader:
+            if len(row) >= 2:
+                yield row[0], row[1]
+
+def sqlite_rows(path, table="vehicle_records"):
+    conn = sqlite3.connect(path)
+    try:
+        cursor = conn.execute(f"SELECT plate, category FROM {table}")
+        while True:
+            batch = cursor.fetchmany(100_000)
+            if not batch:
+                return
+            yield from batch
+    finally:
+        conn.close()
+
+def record_files(path):
+    # A records source is a single file or a directory of them
+    if not os.path.isdir(path):
+        return [path]
+    return sorted(
+        os.path.join(path, name) for name in os.listdir(path)
+        if os.path.splitext(name)[1].lower() in RECORD_EXTENSIONS
+    )
+
+def file_rows(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        return csv_rows(path)
+    if ext in (".db", ".sqlite", ".sqlite3"):
+        return sqlite_rows(path)
+    raise ValueError(f"Unsupported records file: {path}")
+
+def load_records(path, bloom_fp_rate=None, bloom_max_bytes=None):
+    def rows():
+        for name in record_files(path):
+            yield from file_rows(name)
+
+    if os.path.splitext(path)[1].lower() == INDEX_EXTENSION:
+        store = MmapRecords(path)
+    else:
+        store = RecordsStore.from_rows(rows())
+    if bloom_fp_rate:
+        store.enable_bloom(bloom_fp_rate, bloom_max_bytes)
+    return store
+
+# ----------------------------
+# HOT RELOAD
+# ----------------------------
+class LiveRecords:
+    # Wraps the current RecordsStore snapshot of a records file or
+    # directory. A watcher thread polls the files' mtime/size and, when
+    # they change, builds a whole new store in the background and swaps
+    # it in with a single attribute assignment. Lookups read
+    # self.snapshot once, so they never block on a reload and never see
+    # a half-built store. A failed reload keeps the old snapshot.
+    #
+    # With no path the given store is served as-is and never reloaded.
+
+    def __init__(self, path=None, initial=None, poll_seconds=2.0,
+                 bloom_fp_rate=None, bloom_max_bytes=None):
+        self.path = path
+        self.poll_seconds = poll_seconds
+        self.bloom_fp_rate = bloom_fp_rate
+        self.bloom_max_bytes = bloom_max_bytes
+        self.version = 0
+        self.reload_seconds = 0.0
+        self.error = None
+        self.snapshot = None
+
+        self._signature = None
+        self._stop = threading.Event()
+        self._thread = None
+
+        if path is None:
+            if bloom_fp_rate:
+                initial.enable_bloom(bloom_fp_rate, bloom_max_bytes)
+            self._swap(initial, 0.0)
+        else:
+            self.reload()
+            self._thread = threading.Thread(target=self._watch, daemon=True)
+            self._thread.start()
+
+    def _files_signature(self):
+        signature = []
+        for name in record_files(self.path):
+            try:
+                st = os.stat(name)
+            except OSError:
+                continue
+            signature.append((name, st.st_mtime_ns, st.st_size))
+        return signature
+
+    def _swap(self, store, seconds):
+        self.snapshot = store
+        self.version += 1
+        self.reload_seconds = seconds
+
+    def reload(self):
+        signature = self._files_signature()
+        t0 = time.perf_counter()
+        try:
+            store = load_records(self.path, self.bloom_fp_rate,
+                                 self.bloom_max_bytes)
+        except Exception as e:
+            self.error = str(e)
+            if self.snapshot is None:
+                raise
+        else:
+            self.error = None
+            self._swap(store, time.perf_counter() - t0)
+        self._signature = signature
+
+    def _watch(self):
+        # Only reload once the files have stopped changing for one poll,
+        # so a list that is still being copied in is not picked up
+        pending = None
+        while not self._stop.wait(self.poll_seconds):
+            signature = self._files_signature()
+            if signature == self._signature:
+                pending = None
+            elif signature == pending:
+                self.reload()
+                pending = None
+            else:
+                pending = signature
+
+    def lookup(self, plate):
+        return self.snapshot.lookup(plate)
+
+    def known_many(self, keys):
+        return self.snapshot.known_many(keys)
+
+    def verdict_masks_many(self, keys):
+        return self.snapshot.verdict_masks_many(keys)
+
+    def __len__(self):
+        return len(self.snapshot)
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=1.0)
+
+# ----------------------------
+# DECISION ENGINE
+# ----------------------------
+def offense_labels(mask):
+    # Dashboard texts for a verdict mask, in the order verdicts list them
+    labels = ["Invalid License"] if mask & UNREGISTERED else []
+    labels.extend(label for bit, _, label in OFFENSES if mask & bit)
+    return labels
+
+def check_many(store, plates):
+    # Bulk check_vehicle() without fuzzy matching: plate strings (or an
+    # array of them) -> (encoded keys, verdict masks)
+    keys = encode_plates(plates)
+    return keys, store.verdict_masks_many(keys)
+
+# ----------------------------
+# VERDICTS
+# ----------------------------
+class VerdictStatus(enum.Enum):
+    APPROVED = "APPROVED"
+    REJECTED = "REJECTED"
+    MANUAL = "MANUAL APPROVED"
+
+class Verdict:
+    # What check_vehicle() decides about a plate: a status, the verdict
+    # mask (offense bits, UNREGISTERED), an optional note such as a fuzzy
+    # match and, for a fuzzy match, the plate whose record was used. The dashboard text is only formatted when first shown,
+    # and verdicts are shared (see verdict_for() and VerdictCache), so a
+    # plate seen again costs neither the lookup nor the formatting.
+
+    __slots__ = ("status", "mask", "note", "matched", "_text")
+
+    def __init__(self, status, mask=0, note="", matched=None):
+        self.status = status
+        self.mask = mask
+        self.note = note
+        self.matched = matched
+        self._text = None
+
+    @property
+    def approved(self):
+        return self.status is not VerdictStatus.REJECTED
+
+    @property
+    def offenses(self):
+        return offense_labels(self.mask)
+
+    @property
+    def text(self):
+        # "REJECTED | Criminal Record, Invalid License | Read as ..."
+        if self._text is None:
+            parts = [self.status.value]
+            if self.status is VerdictStatus.APPROVED:
+                parts.append("Clean Record")
+            elif self.mask:
+                parts.append(", ".join(self.offenses))
+            if self.note:
+                parts.append(self.note)
+            self._text = " | ".join(parts)
+        return self._text
+
+    def __str__(self):
+        return self.text
+
+    def __repr__(self):
+        return f"Verdict({self.text!r}, mask={self.mask})"
+
+# One shared verdict per mask for the common case without a note
+MASK_VERDICTS = [
+    Verdict(VerdictStatus.REJECTED if mask else VerdictStatus.APPROVED, mask)
+    for mask in range(UNREGISTERED * 2)
+]
+MANUAL_APPROVED = Verdict(VerdictStatus.MANUAL)
+
+def verdict_for(mask, note="", matched=None):
+    if note or matched:
+        status = VerdictStatus.REJECTED if mask else VerdictStatus.APPROVED
+        return Verdict(status, mask, note, matched)
+    return MASK_VERDICTS[mask]
+
+def lookup_failed(error):
+    # A failed lookup must never open the gate
+    return Verdict(VerdictStatus.REJECTED, note=f"Lookup failed ({error})")
+
+def check_vehicle(store, plate, matcher=None, min_confidence=0.8):
+    registered, mask = store.lookup(plate)
+
+    # An unknown plate may be a one-character misread of a known one
+    note = ""
+    matched = None
+    if not registered and matcher is not None:
+        match = matcher.match(plate)
+        if match and match.plate != plate and match.confidence >= min_confidence:
+            registered, mask = store.lookup(match.plate)
+            note = f"Read as {match.plate} ({match.confidence:.0%})"
+            matched = match.plate
+
+    return verdict_for(mask if registered else mask | UNREGISTERED, note,
+                       matched)
+
+# ----------------------------
+# VERDICT CACHE
+# ----------------------------
+class VerdictCache:
+    # check_vehicle() behind an LRU of the last `maxsize` plates, for the
+    # commuters and buses that pass every day. Callable like the check it
+    # wraps and safe to share between verdict workers. A records reload
+    # (a new store.version) empties it, so a cached verdict is never older
+    # than the records.
+
+    def __init__(self, store, matcher=None, min_confidence=0.8, maxsize=4096):
+        self.store = store
+        self.matcher = matcher
+        self.min_confidence = min_confidence
+        self.maxsize = maxsize
+        self.verdicts = OrderedDict()
+        self.version = getattr(store, "version", None)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __call__(self, plate):
+        with self.lock:
+            version = getattr(self.store, "version", None)
+            if version != self.version:
+                self.verdicts.clear()
+                self.version = version
+            verdict = self.verdicts.get(plate)
+            if verdict is not None:
+                self.verdicts.move_to_end(plate)
+                self.hits += 1
+                return verdict
+            self.misses += 1
+
+        verdict = check_vehicle(self.store, plate, self.matcher,
+                                self.min_confidence)
+        with self.lock:
+            if version == self.version:
+                self.verdicts[plate] = verdict
+                if len(self.verdicts) > self.maxsize:
+                    self.verdicts.popitem(last=False)
+                    self.evictions += 1
+        return verdict
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def __len__(self):
+        return len(self.verdicts)
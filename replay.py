@@ -0,0 +1,89 @@
+import csv
+import os
+import time
+
+import cv2
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+
+# ----------------------------
+# REPLAY SOURCE
+# ----------------------------
+class ReplaySource:
+    # Plays a video file or a directory of images (in name order) through
+    # the same read()/isOpened()/get()/release() calls as cv2.VideoCapture,
+    # so it can stand in for a camera anywhere one is used. With
+    # realtime=True frames are paced at `fps` (the file's own rate for
+    # videos), otherwise they come out as fast as they decode.
+    # `name` is the current frame's image file name, or its index in a
+    # video, for matching against ground truth.
+
+    def __init__(self, path, realtime=False, fps=None):
+        self.path = path
+        self.realtime = realtime
+        self.index = -1
+        self.name = None
+
+        if os.path.isdir(path):
+            self.files = sorted(f for f in os.listdir(path)
+                                if f.lower().endswith(IMAGE_EXTENSIONS))
+            self.cap = None
+            self.fps = fps or 25.0
+        else:
+            self.files = None
+            self.cap = cv2.VideoCapture(path)
+            self.fps = fps or self.cap.get(cv2.CAP_PROP_FPS) or 25.0
+
+        self.next_at = None
+
+    def isOpened(self):
+        return bool(self.files) if self.cap is None else self.cap.isOpened()
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FPS:
+            return self.fps
+        if prop == cv2.CAP_PROP_FRAME_COUNT and self.files is not None:
+            return len(self.files)
+        return self.cap.get(prop) if self.cap is not None else 0.0
+
+    def read(self):
+        if self.realtime:
+            now = time.perf_counter()
+            if self.next_at is None:
+                self.next_at = now
+            elif self.next_at > now:
+                time.sleep(self.next_at - now)
+            self.next_at += 1.0 / self.fps
+
+        self.index += 1
+        if self.cap is not None:
+            self.name = str(self.index)
+            return self.cap.read()
+
+        while self.index < len(self.files):
+            self.name = self.files[self.index]
+            frame = cv2.imread(os.path.join(self.path, self.name))
+            if frame is not None:
+                return True, frame
+            self.index += 1
+        return False, None
+
+    def release(self):
+        if self.cap is not None:
+            self.cap.release()
+
+# ----------------------------
+# GROUND TRUTH
+# ----------------------------
+def load_ground_truth(path):
+    # CSV of `frame,plate`: frame is the image file name, or the frame
+    # index for a video; an empty plate marks a frame with no readable
+    # plate. A header row is skipped.
+    truth = {}
+    with open(path, newline="") as f:
+        for row in csv.reader(f):
+            row = [cell.strip() for cell in row]
+            if not row or not row[0] or row[0].lower() == "frame":
+                continue
+            truth[row[0]] = row[1].upper() if len(row) > 1 else ""
+    return truth
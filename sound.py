@@ -0,0 +1,34 @@
+import os
+import platform
+import subprocess
+import sys
+
+# ----------------------------
+# RESOURCE PATH (for EXE)
+# ----------------------------
+def resource_path(relative_path):
+    try:
+        base_path = sys._MEIPASS
+    except AttributeError:
+        base_path = os.path.abspath(".")
+    return os.path.join(base_path, relative_path)
+
+# ----------------------------
+# SOUND
+# ----------------------------
+OS_NAME = platform.system()
+
+def play_sound(sound):
+    try:
+        if OS_NAME == "Windows":
+            import winsound
+            winsound.PlaySound(resource_path(f"sounds/{sound}.wav"),
+                               winsound.SND_ASYNC)
+        elif OS_NAME == "Darwin":
+            subprocess.Popen(
+                ["afplay", resource_path(f"sounds/{sound}.mp3")],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL
+            )
+    except:
+        pass
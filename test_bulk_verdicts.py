@@ -0,0 +1,90 @@
+import csv
+import io
+import json
+
+from bulk_verdicts import Tally, csv_plates, run_csv, run_journal
+from fuzzy_match import FuzzyPlateMatcher
+from journal import manual_event, verdict_event
+from records import MASK_VERDICTS, check_vehicle
+from vehicle_db import demo_records
+
+# ----------------------------
+# CSV INPUT
+# ----------------------------
+PASSAGES = (b"ts,lane,plate\n"
+            b"1,A,mh44ab4444\n"
+            b"\n"
+            b"2,B, KA66EF6666 \r\n"
+            b"  \r\n"
+            b"3,C\n"
+            b"4,D,ZZ11ZZ1111\n"
+            b"\n")
+
+def test_csv_plates_skip_blank_lines():
+    block = PASSAGES.split(b"\n", 1)[1]
+    plates, starts, ends = csv_plates(block, 2)
+    assert [p.decode() for p in plates] == ["MH44AB4444", "KA66EF6666", "",
+                                            "ZZ11ZZ1111"]
+    assert [block[s:e] for s, e in zip(starts, ends)] == [
+        b"1,A,mh44ab4444", b"2,B, KA66EF6666 \r", b"3,C", b"4,D,ZZ11ZZ1111"]
+
+    quoted = block.replace(b"ZZ11ZZ1111", b'"ZZ11ZZ1111"')
+    plates, starts, ends = csv_plates(quoted, 2)
+    assert plates == ["MH44AB4444", "KA66EF6666", "", "ZZ11ZZ1111"]
+    assert len(starts) == len(ends) == 4
+
+def test_run_csv_counts_rows_not_blank_lines():
+    out = io.BytesIO()
+    tally = Tally()
+    run_csv(demo_records(), io.BytesIO(PASSAGES), out, "plate", True, 0,
+            False, tally)
+    rows = out.getvalue().decode().splitlines()
+    assert tally.rows == tally.written == 4
+    assert tally.rejected == 3
+    assert rows == [
+        "ts,lane,plate,verdict,mask,offenses",
+        "1,A,mh44ab4444,APPROVED,0,",
+        "2,B, KA66EF6666 ,REJECTED,1,Criminal Record",
+        "3,C,REJECTED,32,Invalid License",
+        "4,D,ZZ11ZZ1111,REJECTED,32,Invalid License",
+    ]
+
+# ----------------------------
+# JOURNAL RECONCILIATION
+# ----------------------------
+def reconcile(events, changed_only=False):
+    # (output rows without the header, tally) of run_journal over `events`
+    journal = io.BytesIO(b"".join(
+        json.dumps(e, separators=(",", ":")).encode() + b"\n"
+        for e in events))
+    out = io.BytesIO()
+    tally = Tally()
+    run_journal(demo_records(), journal, out, 0, False, changed_only, tally)
+    rows = list(csv.reader(io.StringIO(out.getvalue().decode())))
+    assert rows[0][:4] == ["ts", "lane", "plate", "matched"]
+    return rows[1:], tally
+
+def test_fuzzy_match_is_rechecked_as_matched():
+    records = demo_records()
+    verdict = check_vehicle(records, "DL55CO5555", FuzzyPlateMatcher(records))
+    assert verdict.approved and verdict.matched == "DL55CD5555"
+
+    rows, tally = reconcile([verdict_event("MAIN", "DL55CO5555", verdict, 50)])
+    assert tally.changed == 0
+    assert rows[0][2:8] == ["DL55CO5555", "DL55CD5555", "no", "APPROVED",
+                            "APPROVED", "0"]
+
+def test_changed_verdicts_are_counted_but_manual_ones_are_not():
+    events = [
+        # Approved then, criminal record now
+        verdict_event("MAIN", "KA66EF6666", MASK_VERDICTS[0], 50),
+        # Unchanged
+        verdict_event("MAIN", "MH44AB4444", MASK_VERDICTS[0], 50),
+        # The operator's call, whatever the records say
+        manual_event("MAIN", "MH99AB9999", 50),
+    ]
+    rows, tally = reconcile(events, changed_only=True)
+    assert tally.rows == 3
+    assert tally.changed == 1
+    assert [row[2] for row in rows] == ["KA66EF6666"]
+    assert rows[0][5:7] == ["APPROVED", "REJECTED"]
@@ -0,0 +1,59 @@
+import os
+
+import numpy as np
+
+from evidence import EvidenceStore
+
+FRAME = np.full((48, 64, 3), 128, dtype=np.uint8)
+CROP = FRAME[10:20, 10:40]
+
+def files(root):
+    return sorted(name for _, _, names in os.walk(root) for name in names)
+
+# ----------------------------
+# EVIDENCE STORE
+# ----------------------------
+def test_frame_and_plate_crop_are_written(tmp_path):
+    store = EvidenceStore(str(tmp_path), workers=1)
+    evidence_id = store.save(FRAME, CROP, "KA66EF6666", "rejected", "A")
+    store.save(FRAME, None, "MH44AB4444", "manual", "A")
+    store.close()
+    assert store.saved == 2 and store.errors == 0
+    assert (tmp_path / (evidence_id + "_frame.jpg")).exists()
+    assert (tmp_path / (evidence_id + "_plate.jpg")).exists()
+    assert len(files(tmp_path)) == 3
+
+def test_dropped_ids_are_reported(tmp_path):
+    # No workers: the queue only fills up
+    lost = []
+    store = EvidenceStore(str(tmp_path), workers=0, max_pending=2,
+                          on_lost=lambda *args: lost.append(args))
+    ids = [store.save(FRAME, CROP, f"KA66EF666{i}") for i in range(3)]
+    assert all(ids)
+    assert lost == [(ids[0], "dropped")]
+    assert store.dropped == 1
+
+def test_drop_newest_hands_out_no_id(tmp_path):
+    lost = []
+    store = EvidenceStore(str(tmp_path), workers=0, max_pending=1,
+                          policy="drop_newest",
+                          on_lost=lambda *args: lost.append(args))
+    assert store.save(FRAME)
+    assert store.save(FRAME) is None
+    assert lost == [] and store.dropped == 1
+
+def test_failed_writes_are_reported(tmp_path):
+    lost = []
+    store = EvidenceStore(str(tmp_path), workers=1,
+                          on_lost=lambda *args: lost.append(args))
+    evidence_id = store.save(np.zeros((0, 0, 3), dtype=np.uint8))
+    store.close()
+    assert store.errors == 1
+    assert lost == [(evidence_id, "write failed")]
+
+def test_quota_evicts_the_oldest_files(tmp_path):
+    store = EvidenceStore(str(tmp_path), workers=1, quota_bytes=1)
+    store.save(FRAME, CROP)
+    store.close()
+    assert store.evicted == 2
+    assert files(tmp_path) == []
@@ -0,0 +1,46 @@
+from fuzzy_match import CONFUSABLE, FuzzyPlateMatcher, normalize_plate
+from plate_voting import PlateVoter
+from records import check_vehicle, is_valid_plate
+from vehicle_db import VALID_LICENSE, demo_records
+
+# ----------------------------
+# MISREADS THROUGH THE LANE PATH
+# ----------------------------
+def misreads(plate):
+    # Every single-character confusable misread of a plate
+    swaps = {}
+    for a, b in CONFUSABLE:
+        swaps.setdefault(a, []).append(b)
+        swaps.setdefault(b, []).append(a)
+    for i, c in enumerate(plate):
+        for wrong in swaps.get(c, ()):
+            yield plate[:i] + wrong + plate[i + 1:]
+
+def lane_verdict(records, matcher, read):
+    # What a lane decides after OCR returns `read` on every frame
+    voter = PlateVoter(validate=is_valid_plate, normalize=normalize_plate)
+    consensus = None
+    while consensus is None:
+        consensus = voter.add(read, 90)
+    return check_vehicle(records, consensus.plate, matcher)
+
+def test_confusable_misreads_get_the_true_verdict():
+    records = demo_records()
+    matcher = FuzzyPlateMatcher(records)
+    cases = 0
+    wrong = []
+    for plate in sorted(VALID_LICENSE):
+        expected = check_vehicle(records, plate)
+        for read in misreads(plate):
+            cases += 1
+            verdict = lane_verdict(records, matcher, read)
+            if verdict.mask != expected.mask:
+                wrong.append((plate, read, verdict.text))
+    assert cases > 100
+    assert wrong == []
+
+def test_fuzzy_match_is_noted():
+    records = demo_records()
+    verdict = lane_verdict(records, FuzzyPlateMatcher(records), "DL55C05555")
+    assert verdict.approved
+    assert verdict.note.startswith("Read as DL55CD5555")
@@ -0,0 +1,96 @@
+import os
+
+from journal import (TransactionJournal, compact_journal, lane_totals,
+                     manual_event, plate_event, read_journal, snapshot_event,
+                     verdict_event)
+from records import MASK_VERDICTS
+
+REJECTED = MASK_VERDICTS[1]
+APPROVED = MASK_VERDICTS[0]
+
+def toll_day():
+    # Two lanes' worth of events, as the lanes emit them
+    return [
+        plate_event("A", "MH44AB4444", 0.9),
+        verdict_event("A", "MH44AB4444", APPROVED, 50),
+        verdict_event("A", "KA66EF6666", REJECTED, 50),
+        manual_event("A", "KA66EF6666", 50),
+        verdict_event("B", "DL55CD5555", APPROVED, 50),
+    ]
+
+DAY_TOTALS = {
+    "A": ({"total": 2, "approved": 1, "rejected": 1, "manual_approved": 1},
+          100),
+    "B": ({"total": 1, "approved": 1, "rejected": 0, "manual_approved": 0},
+          50),
+}
+
+# ----------------------------
+# REPLAY
+# ----------------------------
+def test_lane_totals_replay():
+    assert lane_totals(toll_day()) == DAY_TOTALS
+
+def test_lane_totals_start_from_the_last_snapshot():
+    events = ([verdict_event("A", "X", APPROVED, 50)]
+              + [snapshot_event(DAY_TOTALS), 123, ["not", "an", "event"]]
+              + [verdict_event("B", "DL55CD5555", REJECTED, 50)])
+    totals = lane_totals(events)
+    assert totals["A"] == DAY_TOTALS["A"]
+    assert totals["B"] == ({"total": 2, "approved": 1, "rejected": 1,
+                            "manual_approved": 0}, 50)
+
+# ----------------------------
+# JOURNAL WRITER
+# ----------------------------
+def write(path, events, **settings):
+    journal = TransactionJournal(str(path), **settings)
+    for event in events:
+        journal.record(event)
+    journal.close()
+    return journal
+
+def test_journal_commits_everything_on_close(tmp_path):
+    path = tmp_path / "toll.jsonl"
+    journal = write(path, toll_day(), fsync="never")
+    assert journal.written == 5 and journal.error is None
+    assert ([(e["type"], e["plate"]) for e in read_journal(str(path))]
+            == [(e["type"], e["plate"]) for e in toll_day()])
+    assert lane_totals(read_journal(str(path))) == DAY_TOTALS
+
+def test_torn_last_line_is_skipped_and_terminated(tmp_path):
+    path = tmp_path / "toll.jsonl"
+    write(path, toll_day()[:2])
+    with open(path, "ab") as f:
+        f.write(b'{"type":"verdict","lane":"A"')
+    write(path, toll_day()[2:])
+    assert lane_totals(read_journal(str(path))) == DAY_TOTALS
+    assert len(list(read_journal(str(path)))) == 5
+
+def test_rotate_keeps_totals_in_the_new_file(tmp_path):
+    path = tmp_path / "toll.jsonl"
+    journal = TransactionJournal(str(path), fsync="always")
+    for event in toll_day()[:3]:
+        journal.record(event)
+    journal.rotate()
+    for event in toll_day()[3:]:
+        journal.record(event)
+    journal.close()
+
+    segment = journal.segment
+    assert os.path.dirname(segment) == str(tmp_path)
+    assert len(list(read_journal(segment))) == 3
+    current = list(read_journal(str(path)))
+    assert current[0]["type"] == "snapshot"
+    assert len(current) == 3
+    assert lane_totals(current) == DAY_TOTALS
+
+def test_compact_folds_history_into_one_snapshot(tmp_path):
+    path = tmp_path / "toll.jsonl"
+    write(path, toll_day())
+    with open(path, "ab") as f:
+        f.write(b"{torn\n")
+    assert compact_journal(str(path)) == (5, 1)
+    events = list(read_journal(str(path)))
+    assert [e["type"] for e in events] == ["snapshot"]
+    assert lane_totals(events) == DAY_TOTALS
@@ -0,0 +1,153 @@
+import numpy as np
+import pytest
+
+from records import (LiveRecords, MmapRecords, PlateIndex, VerdictCache,
+                     check_vehicle, decode_plate, encode_plate, encode_plates,
+                     load_records, write_index)
+from vehicle_db import VALID_LICENSE, demo_records
+
+# ----------------------------
+# PLATE ENCODING
+# ----------------------------
+def test_encode_decode_round_trip():
+    plates = ["KA66EF6666", "MH44AB4444", "A", "0", "ZZ99ZZ9999ZZ",
+              "AB1", "9Z"]
+    keys = encode_plates(plates)
+    assert keys.tolist() == [encode_plate(p) for p in plates]
+    assert all(keys)
+    assert len(set(keys.tolist())) == len(plates)
+    assert [decode_plate(k) for k in keys] == plates
+
+def test_unencodable_plates_are_zero():
+    plates = ["", "ka66ef6666", "KA-66", "ABCDEFGHIJKLM", "KÄ66EF6666",
+              b"KA66EF6666"]
+    assert encode_plates(plates).tolist() == [0, 0, 0, 0, 0,
+                                              encode_plate("KA66EF6666")]
+    assert [encode_plate(p) for p in plates[:5]] == [0] * 5
+    assert encode_plates([]).tolist() == []
+
+# ----------------------------
+# HASH INDEX
+# ----------------------------
+def test_plate_index_lookups():
+    rng = np.random.default_rng(6)
+    keys = np.unique(rng.integers(1, 37 ** 12, 5000))
+    values = (keys % 31 + 1).astype(np.uint8)
+    index = PlateIndex(keys, values)
+    missing = np.setdiff1d(rng.integers(1, 37 ** 12, 5000), keys)
+
+    assert len(index) == len(keys)
+    assert index.get_many(keys).tolist() == values.tolist()
+    assert not index.get_many(missing).any()
+    for key, value in zip(keys[:200].tolist(), values[:200].tolist()):
+        assert index.get(key) == value
+        assert key in index
+    for key in missing[:200].tolist():
+        assert index.get(key, 99) == 99
+        assert key not in index
+
+def test_plate_index_colliding_keys():
+    # Keys that all hash to the same slot probe past each other
+    shift = PlateIndex([1, 2, 3, 4, 5]).shift
+    keys = [k for k in range(1, 200_000)
+            if ((k * 0x9E3779B97F4A7C15) & (2**64 - 1)) >> shift == 0][:5]
+    assert len(keys) == 5
+    index = PlateIndex(keys, [1, 2, 3, 4, 5])
+    assert index.shift == shift
+    assert index.get_many(keys).tolist() == [1, 2, 3, 4, 5]
+    assert [index.get(k) for k in keys] == [1, 2, 3, 4, 5]
+
+# ----------------------------
+# BLOOM PREFILTER
+# ----------------------------
+def test_bloom_false_positives_still_get_the_exact_verdict():
+    # A one-word filter passes most clean plates, so lookup() has to
+    # fall through to the exact offense lookup and find nothing
+    plain = demo_records()
+    store = demo_records().enable_bloom(0.01, max_bytes=8)
+    plates = sorted(VALID_LICENSE) + ["MH99AB9999", "DL88AA8888",
+                                      "MP22PU2222", ""]
+    assert [store.lookup(p) for p in plates] == [plain.lookup(p)
+                                                 for p in plates]
+    assert store.bloom_false_positives > 0
+    assert store.bloom_positives >= store.bloom_false_positives
+    assert store.bloom_negatives + store.bloom_positives == len(plates) - 1
+
+def test_bloom_passes_every_offense_plate():
+    plain = demo_records()
+    store = demo_records().enable_bloom(0.01)
+    assert store.bloom.fp_rate <= 0.01
+    for key in store.offense_keys.tolist():
+        assert key in store.bloom
+        plate = decode_plate(key)
+        assert store.lookup(plate) == plain.lookup(plate)
+    assert store.bloom_positives == len(store.offense_keys)
+    assert store.bloom_false_positives == 0
+
+# ----------------------------
+# MEMORY-MAPPED INDEX
+# ----------------------------
+def test_mmap_index_matches_the_store(tmp_path):
+    store = demo_records()
+    path = str(tmp_path / "records.tgx")
+    write_index(path, store.registered_keys, store.offense_keys,
+                store.offense_masks)
+    assert not (tmp_path / "records.tgx.tmp").exists()
+
+    mapped = load_records(path)
+    assert isinstance(mapped, MmapRecords)
+    assert len(mapped) == len(store)
+    plates = sorted(VALID_LICENSE) + ["MP22PU2222", "MH99AB9999", "", "x"]
+    assert [mapped.lookup(p) for p in plates] == [store.lookup(p)
+                                                  for p in plates]
+    keys = encode_plates(plates)
+    assert (mapped.verdict_masks_many(keys).tolist()
+            == store.verdict_masks_many(keys).tolist())
+
+def test_mmap_index_empty_lists(tmp_path):
+    path = str(tmp_path / "empty.tgx")
+    empty = np.zeros(0, dtype=np.int64)
+    write_index(path, empty, empty, np.zeros(0, dtype=np.uint8))
+    mapped = MmapRecords(path)
+    assert len(mapped) == 0
+    assert mapped.lookup("KA66EF6666") == (False, 0)
+
+def test_mmap_index_rejects_other_files(tmp_path):
+    path = tmp_path / "bogus.tgx"
+    path.write_bytes(b"not an index" + bytes(64))
+    with pytest.raises(ValueError):
+        MmapRecords(str(path))
+
+# ----------------------------
+# VERDICT CACHE
+# ----------------------------
+def test_verdict_cache_evicts_the_least_recent_plate():
+    store = demo_records()
+    cache = VerdictCache(store, maxsize=2)
+    a, b, c = "KA66EF6666", "MH44AB4444", "MH99AB9999"
+    cache(a)
+    cache(b)
+    assert cache(a) is cache(a)
+    cache(c)
+    assert list(cache.verdicts) == [a, c]
+    assert (cache.hits, cache.misses, cache.evictions) == (2, 3, 1)
+
+    assert cache(b).mask == check_vehicle(store, b).mask
+    assert list(cache.verdicts) == [c, b]
+    assert (cache.misses, cache.evictions, len(cache)) == (4, 2, 2)
+
+def test_verdict_cache_empties_on_reload(tmp_path):
+    path = tmp_path / "records.csv"
+    path.write_text("plate,category\nKA66EF6666,valid\n")
+    live = LiveRecords(str(path), poll_seconds=60)
+    try:
+        cache = VerdictCache(live)
+        assert cache("KA66EF6666").approved
+        path.write_text("plate,category\nKA66EF6666,valid\n"
+                        "KA66EF6666,criminal\n")
+        live.reload()
+        verdict = cache("KA66EF6666")
+        assert verdict.offenses == ["Criminal Record"]
+        assert (cache.hits, cache.misses) == (0, 2)
+    finally:
+        live.stop()
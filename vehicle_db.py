@@ -0,0 +1,85 @@
+from records import (ACCIDENT, CRIMINAL, INSURANCE, PUC, TRAFFIC,
+                     RecordsStore)
+
+# ----------------------------
+# DATABASES
+# ----------------------------
+VALID_LICENSE = {
+    # Clean records
+    "MH44AB4444", "DL55CD5555", "GJ22LM2222",
+    "HR33MN3333", "KA11UV1111",
+
+    # Criminal record
+    "KA66EF6666", "KA77BC7777", "UP88CD8888", "RJ22EF2222",
+
+    # Traffic violations
+    "TN77GH7777", "HR66GH6666", "PB77JK7777",
+
+    # Insurance / PUC
+    "WB88JK8888", "MP66KG6666",
+
+    # Multiple offenses
+    "UP44CR4444", "BR55MD5555", "RJ77PN7777"
+}
+
+# Criminal records
+CRIMINAL_RECORDS = {
+    "KA66EF6666",
+    "KA77BC7777",
+    "UP88CD8888",
+    "RJ22EF2222",
+    "UP44CR4444",
+    "RJ77PN7777"
+}
+
+# Traffic violations
+TRAFFIC_VIOLATIONS = {
+    "TN77GH7777",
+    "HR66GH6666",
+    "PB77JK7777",
+    "BR55MD5555",
+    "RJ77PN7777"
+}
+
+# Insurance expired
+INSURANCE_EXPIRED = {
+    "WB88JK8888",
+    "BR55MD5555",
+    "MP66KG6666"
+}
+
+# PUC invalid
+PUC_INVALID = {
+    "MP66KG6666",
+    "MP22PU2222",
+    "UP33PU3333",
+    "BR44PU4444",
+    "RJ55PU5555"
+}
+
+# Accident records
+ACCIDENT_RECORDS = {
+    "UP44CR4444",
+    "RJ77PN7777"
+}
+
+# ----------------------------
+# INVALID LICENSE (not listed in VALID_LICENSE)
+# ----------------------------
+# MH99AB9999
+# DL88AA8888
+# KA55BB5555
+# RJ66CC6666
+# PB77DD7777
+
+# ----------------------------
+# DEMO RECORDS STORE
+# ----------------------------
+def demo_records():
+    return RecordsStore.from_sets(VALID_LICENSE, {
+        CRIMINAL: CRIMINAL_RECORDS,
+        TRAFFIC: TRAFFIC_VIOLATIONS,
+        INSURANCE: INSURANCE_EXPIRED,
+        PUC: PUC_INVALID,
+        ACCIDENT: ACCIDENT_RECORDS,
+    })
@@ -0,0 +1,62 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from records import lookup_failed
+
+SPINNER = "|/-\\"
+
+# ----------------------------
+# VERDICT JOBS
+# ----------------------------
+class VerdictJob:
+    # One plate being checked. The UI loop polls done() every frame and
+    # keeps rendering in the meantime; result() gives the verdict and the
+    # measured lookup latency in seconds.
+
+    def __init__(self, plate, future):
+        self.plate = plate
+        self.future = future
+        self.started = time.perf_counter()
+
+    def done(self):
+        return self.future.done()
+
+    def result(self):
+        return self.future.result()
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def progress_text(self):
+        spin = SPINNER[int(self.elapsed() * 10) % len(SPINNER)]
+        return (f"ANALYSING VEHICLE RECORDS {spin} "
+                f"{self.elapsed() * 1000:.0f} ms")
+
+    def cancel(self):
+        self.future.cancel()
+
+class VerdictPipeline:
+    # Runs check_vehicle, and any slower remote or database lookups it
+    # grows later, on a small thread pool so the frame loop never waits
+    # for a verdict.
+
+    def __init__(self, check_vehicle, workers=2):
+        self.check_vehicle = check_vehicle
+        self.executor = ThreadPoolExecutor(workers,
+                                           thread_name_prefix="verdict")
+
+    def _run(self, plate):
+        # A failed lookup must never open the gate; the operator can still
+        # approve manually
+        t0 = time.perf_counter()
+        try:
+            verdict = self.check_vehicle(plate)
+        except Exception as e:
+            verdict = lookup_failed(e)
+        return verdict, time.perf_counter() - t0
+
+    def submit(self, plate):
+        return VerdictJob(plate, self.executor.submit(self._run, plate))
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)